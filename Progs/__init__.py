@@ -1,41 +1,80 @@
 from . import common
-from . import template
-prog_defs = []
-installed_prog_defs = []
+manifest = None
+_prog_defs = {}
 
 
 def setup(Settings):
-    """Initialize the prog_defs array.
+    """Load the manifest of the ProgDefs.
 
-    The prog_defs array contains keyword descriptors for all supported
-    program configuration files (i.e. ProgDefs). A ProgDef can by added
-    by simply adding a '.py' file, it will be parsed.
+    The manifest lists every supported program configuration file
+    description (i.e. ProgDefs). A ProgDef can by added by simply adding a
+    '.py' file defining a class of the same name, it will be parsed (see
+    :mod:`Progs.manifest`). ProgDef modules are only imported when the
+    ProgDef is needed, by :func:`get_prog_def`.
     """
 
     import os
-    import logging
-    global prog_defs, installed_prog_defs
+    from .manifest import Manifest
+    global manifest
 
-    prog_defs = []
-    logger = logging.getLogger('Systhemer.Progs')
     common.Settings = Settings
+    common.utils.refresh_probes()
+    _prog_defs.clear()
+    manifest = Manifest.load(os.path.dirname(os.path.abspath(__file__)))
 
-    for pf in filter(lambda p: p[-3:] == '.py' and
-                     p[:-3] not in ['__init__', 'template', 'common',
-                                    'value', 'config'],
-                     os.listdir('Progs')):
-        logger.debug('found ProgDef: %s', pf)
+
+def get_names(installed=True):
+    """Return the names of the ProgDefs.
+
+    With `installed`, only the names of the ProgDefs that are installed,
+    importing the ProgDefs that have no declarative probe to check.
+    """
+    return [e.name for e in manifest if not installed or is_installed(e.name)]
+
+
+def is_installed(name):
+    """Return whether the ProgDef `name` is installed."""
+    installed = manifest.is_installed(name)
+    if installed is None:
+        installed = get_prog_def(name).is_installed()
+    return installed
+
+
+def get_prog_def(name):
+    """Return the ProgDef `name`, importing its module if needed."""
+    if name not in _prog_defs:
+        import importlib
+        import logging
+        from . import template
+        logger = logging.getLogger('Systhemer.Progs')
+
+        entry = manifest[name]
+        logger.debug('importing ProgDef: %s', entry.module)
         try:
-            exec('from .' + pf[:-3] + ' import ' + pf[:-3])
+            module = importlib.import_module('.' + entry.module, __name__)
         except Exception as e:
-            logger.critical('Error in import of `{}`:'.format(pf[:-3]))
+            logger.critical('Error in import of `{}`:'.format(entry.module))
             logger.critical(e)
+            exit(1)
 
-        prog_defs.append(eval(pf[:-3] + '()'))
-        if not isinstance(prog_defs[-1], template.ProgDef):
+        pd = getattr(module, name)()
+        if not isinstance(pd, template.ProgDef):
             logger.critical('Prog def \'%s\' does not inherit'
-                            'from template.ProgDef!', pf[:-3])
+                            'from template.ProgDef!', name)
             exit(1)
+        _prog_defs[name] = pd
+    return _prog_defs[name]
+
+
+def get_prog_defs(installed=True):
+    """Return the ProgDefs, see :func:`get_names`."""
+    return [get_prog_def(n) for n in get_names(installed)]
 
-    installed_prog_defs = [p for p in prog_defs if p.is_installed()]
 
+def __getattr__(name):
+    # all ProgDefs, imported on access
+    if name == 'prog_defs':
+        return get_prog_defs(installed=False)
+    if name == 'installed_prog_defs':
+        return get_prog_defs()
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
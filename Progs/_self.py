@@ -6,9 +6,16 @@ from . import value
 
 class _self(ProgDef):
     """describes self"""
+    # sets the Settings of the main process
+    parallel = False
+    cacheable = False
+
     def __init__(self):
         self.pre_init()
 
+    def init(self):
+        pass  # no rules, values are set in the Settings
+
     def set(self, key, val, section):
         if section == 'self':
             if isinstance(val, value.Litteral):
@@ -19,8 +26,16 @@ class _self(ProgDef):
                 self.logger.critical('Invalid data type for _self variable!')
                 exit(1)
 
-    def is_installed(self):
-        return True
+    def apply(self, values):
+        for section_id, section in values.items():
+            for key, val in section.items():
+                self.set(key, val, section_id)
+
+    def diff_values(self, old, new):
+        old_section = old.get('self', {})
+        changed = {key: val for key, val in new.get('self', {}).items()
+                   if old_section.get(key) != val}
+        return {'self': changed} if changed else {}
 
     def save(self):
-        return
+        return False
@@ -0,0 +1,82 @@
+"""Asynchronous file I/O for program definitions.
+
+Loading and saving configuration files is blocking I/O, which dominates
+the run time on slow (e.g. network) file systems. The functions of this
+module run the file operations of many ProgDefs in threads, driven by
+asyncio, so that they overlap. At most `limit` operations run at once.
+
+Functions:
+    * :func:`prefetch` - Load the files of many programs
+    * :func:`save_all` - Save the files of many programs
+"""
+
+
+import asyncio
+import logging
+import time
+from .common import utils
+logger = logging.getLogger('Systhemer.Progs.aio')
+
+LIMIT = 16
+
+
+async def _in_thread(sem, func, *args):
+    """Run `func(*args)` in a thread once `sem` is acquired."""
+    async with sem:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+
+async def prefetch(prog_defs, limit=LIMIT):
+    """Load everything the ProgDefs of `prog_defs` will read.
+
+    For every ProgDef, the filebuffer (which is also the diff baseline)
+    is loaded, then the backup file is written (with the `make_backup`
+    setting) and the hash of the output file is read, concurrently.
+    """
+    sem = asyncio.Semaphore(limit)
+    make_backup = utils.get_setting('make_backup')
+
+    async def fetch(pd):
+        await _in_thread(sem, pd.load_file_buffer)
+        tasks = [_in_thread(sem, pd.get_file_hash, pd.get_out_file_path())]
+        if make_backup:
+            tasks.append(_in_thread(sem, pd.mk_backup))
+        await asyncio.gather(*tasks)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(fetch(pd) for pd in prog_defs))
+    logger.debug('Prefetched files of %s programs in %.3fs',
+                 len(prog_defs), time.perf_counter() - start)
+
+
+async def save_all(prog_defs, limit=LIMIT):
+    """Save the ProgDefs of `prog_defs`, overlapping their writes.
+
+    Pre-save and post-save hooks may print (e.g. diffs), so they are run
+    in the main thread, program by program, in order.
+
+    Returns the wall time each ProgDef took to save, in seconds.
+    """
+    sem = asyncio.Semaphore(limit)
+
+    async def save(pd):
+        start = time.perf_counter()
+        changed = await _in_thread(sem, pd.save)
+        return changed, time.perf_counter() - start
+
+    times = []
+    for pd in prog_defs:
+        start = time.perf_counter()
+        pd.pre_save()
+        times.append(time.perf_counter() - start)
+
+    if utils.get_setting('no_save'):
+        return times
+
+    results = await asyncio.gather(*(save(pd) for pd in prog_defs))
+    for i, (pd, (changed, elapsed)) in enumerate(zip(prog_defs, results)):
+        start = time.perf_counter()
+        pd.post_save(changed)
+        times[i] += elapsed + time.perf_counter() - start
+    return times
@@ -0,0 +1,158 @@
+"""Rendering many themes with many configurations.
+
+A batch renders every theme of a set with every configuration of a set
+of targets, each target being a ProgDef and an input configuration. The
+rule tree of each ProgDef and the scope index of each configuration are
+built once, then only read by the renders (see :meth:`ProgDef.render`),
+so a render only matches the rules of the theme's keys.
+
+Renders are written to ``<output dir>/<theme>/<ProgDef>/<configuration
+file name>``, one theme after the other or in a pool of worker processes
+(as in :mod:`Progs.jobs`).
+
+Classes:
+    * :class:`Target` - ProgDef and input configuration to render
+
+Functions:
+    * :func:`load_target` - Build the :class:`Target` of a configuration
+    * :func:`render_theme` - Render a theme for every target
+    * :func:`render_all` - Render every theme for every target
+"""
+
+
+import logging
+import os
+import time
+from collections import namedtuple
+from . import jobs as jobs_
+from .scope import ScopeIndex
+logger = logging.getLogger('Systhemer.Progs.batch')
+
+
+Target = namedtuple('Target', ['pd', 'path', 'text', 'index'])
+Target.__doc__ = """Input configuration of a ProgDef, ready to be rendered.
+
+:param pd: :class:`~Progs.template.ProgDef` rendering the configuration
+:param str path: path of the configuration
+:param str text: contents of the configuration
+:param index: :class:`~Progs.scope.ScopeIndex` of `text`
+"""
+
+
+def load_target(pd, path):
+    """Return the :class:`Target` rendering the configuration `path` with
+    the ProgDef `pd`."""
+    try:
+        with open(path) as f:
+            text = f.read()
+    except OSError as e:
+        logger.critical('Could not read configuration \'%s\': %s', path, e)
+        exit(1)
+    return Target(pd, path, text, ScopeIndex(text, pd.get_config()))
+
+
+def get_out_path(out_dir, theme, target):
+    return os.path.join(out_dir, theme, target.pd.get_name(),
+                        os.path.basename(target.path))
+
+
+def render_theme(theme, values, targets, out_dir):
+    """Render `values` for every target of `targets` and write them.
+
+    :param str theme: name of the theme, its directory in `out_dir`
+    :param dict values: ``{section: {key: value}}`` dictionary
+    :param list targets: :class:`Target` objects
+    :param str out_dir: root of the output tree
+
+    Returns the number of renders written.
+    """
+    for target in targets:
+        logger.debug('Rendering theme \'%s\' for %s', theme, target.path)
+        out_path = get_out_path(out_dir, theme, target)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        with open(out_path, 'w') as f:
+            f.write(target.pd.render(values, target.text, target.index))
+    return len(targets)
+
+
+_targets = None  # targets of a worker, sent once by _init_worker
+
+
+def _init_worker(settings, targets):
+    global _targets
+    jobs_._init_worker(settings)
+    _targets = targets
+
+
+def _render_job(theme, values, out_dir):
+    # log records are sent back to the parent, as in Progs.jobs
+    handler = jobs_._RecordHandler()
+    logging.getLogger('Systhemer').handlers = [handler]
+    count, status = _render_safe(theme, values, _targets, out_dir)
+    return handler.records, count, status
+
+
+def _render_safe(theme, values, targets, out_dir):
+    """Return the number of renders of `theme` and its exit status."""
+    try:
+        return render_theme(theme, values, targets, out_dir), 0
+    except SystemExit as e:
+        return 0, e.code
+    except Exception:
+        logger.exception('Error while rendering theme: \'%s\'', theme)
+        return 0, 1
+
+
+def render_all(themes, targets, out_dir, Settings, jobs=1):
+    """Render every theme of `themes` for every target of `targets`.
+
+    :param list themes: ``(name, values)`` tuples
+    :param list targets: :class:`Target` objects
+    :param str out_dir: root of the output tree
+    :param int jobs: number of worker processes, themes being rendered
+        in this process if 1
+
+    A theme failing to render is reported and skipped. Exits if themes
+    (e.g. ``dark.ini`` and ``dark.conf``) or configurations would be
+    rendered to the same path. Returns the number of renders written, the
+    time they took in seconds and the exit status.
+    """
+    paths = [get_out_path('', '', t) for t in targets]
+    for path in {p for p in paths if paths.count(p) > 1}:
+        logger.critical('Many configurations would be rendered to \'%s\'',
+                        path)
+        exit(1)
+    names = set()
+    for name, values in themes:
+        if name in names:
+            logger.critical('Many themes would be rendered to \'%s\'',
+                            os.path.join(out_dir, name))
+            exit(1)
+        names.add(name)
+
+    start = time.perf_counter()
+    results = []
+    if jobs > 1 and len(themes) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        logger.info('Rendering %s themes with %s jobs', len(themes), jobs)
+        # the targets are sent once to each worker, with their scope index
+        with ProcessPoolExecutor(jobs, initializer=_init_worker,
+                                 initargs=(jobs_.snapshot_settings(Settings),
+                                           targets)) as executor:
+            futures = [executor.submit(_render_job, name, values, out_dir)
+                       for name, values in themes]
+            for future in futures:
+                records, count, status = future.result()
+                for record in records:
+                    logging.getLogger(record.name).handle(record)
+                results.append((count, status))
+    else:
+        for name, values in themes:
+            results.append(_render_safe(name, values, targets, out_dir))
+
+    elapsed = time.perf_counter() - start
+    status = 0
+    for count, job_status in results:
+        status = status or job_status
+    return sum(count for count, job_status in results), elapsed, status
+
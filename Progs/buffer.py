@@ -0,0 +1,92 @@
+"""Text buffers for configuration files.
+
+Classes:
+    * :class:`PieceTable` - Editable text that never copies the whole text
+"""
+
+
+class PieceTable(object):
+    """Editable text stored as a list of pieces.
+
+    A piece is a ``(source, start, end)`` tuple referencing a slice of
+    either the original text or of an inserted string, so editing a span
+    never copies the rest of the text. The text is only joined into a
+    `str` when asked for (``str(table)``), and the result is kept until
+    the next edit.
+
+    Edits are applied in batches (:meth:`replace_spans`), positions in
+    the text being mapped across them by the scope index (see
+    :meth:`Progs.scope.ScopeIndex.shift`). ``version`` is incremented on
+    every edit.
+    """
+    def __init__(self, text=''):
+        self.original = text
+        self.pieces = [(text, 0, len(text))] if text else []
+        self.offsets = [0] if text else []
+        self.length = len(text)
+        self.version = 0
+        self._text = text
+
+    def __repr__(self):
+        return self.__class__.__name__ + '(%s pieces, %s chars)' \
+            % (len(self.pieces), self.length)
+
+    def __str__(self):
+        if self._text is None:
+            self._text = ''.join(src[s:e] for src, s, e in self.pieces)
+        return self._text
+
+    def __len__(self):
+        return self.length
+
+    def _edited(self):
+        self.version += 1
+        self._text = None
+
+    def replace_spans(self, replacements):
+        """Apply many replacements in a single pass over the pieces.
+
+        :param list replacements: sorted, non-overlapping
+            ``(startpos, endpos, text)`` tuples (or longer tuples, such as
+            :class:`~Progs.config.Edit`), positions being those of the
+            text before any of them is applied
+        """
+        if not replacements:
+            return
+
+        pieces = []
+        offsets = []
+        length = 0
+        k = 0    # current piece
+        pos = 0  # position up to which the old text was handled
+
+        def add(src, s, e):
+            nonlocal length
+            if e > s:
+                pieces.append((src, s, e))
+                offsets.append(length)
+                length += e - s
+
+        def copy_to(stop):
+            # copy the old text from `pos` to `stop`
+            nonlocal k, pos
+            while pos < stop:
+                src, s, e = self.pieces[k]
+                offset = self.offsets[k]
+                if offset + e - s <= pos:
+                    k += 1
+                    continue
+                seg_end = min(stop, offset + e - s)
+                add(src, s + pos - offset, s + seg_end - offset)
+                pos = seg_end
+
+        for start, end, text, *_ in replacements:
+            copy_to(start)
+            add(text, 0, len(text))
+            pos = end
+        copy_to(self.length)
+
+        self.pieces = pieces
+        self.offsets = offsets
+        self.length = length
+        self._edited()
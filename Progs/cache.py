@@ -0,0 +1,181 @@
+"""Persistent cache of the applied themes.
+
+Applying the same theme to configuration files that did not change gives
+the same files again. The cache remembers, for each ProgDef, what the
+files were last written from, to skip the ProgDef entirely (no rule tree
+built, no file read, no save) when nothing changed since.
+
+The key of a ProgDef hashes:
+
+    * the values of the theme keys its rules use, as written in the theme
+      file, the keys being saved with the key: ProgDefs are checked before
+      the theme values are parsed, which needs their rule trees
+    * the stats of the source files of the ProgDef and of the modules
+      applying it, standing for the version of its rule tree
+    * the stats of its input and output files, standing for their contents
+
+Classes:
+    * :class:`ApplyCache` - Cache of the keys of the last applied ProgDefs
+"""
+
+
+import json
+import logging
+import os
+from .common import utils
+logger = logging.getLogger('Systhemer.Progs.cache')
+
+# modules whose code changes what ProgDefs write
+core_modules = ('template', 'config', 'value', 'expr', 'buffer', 'scope',
+                'common')
+
+
+def match_key(wild_key, key):
+    """Return whether the key with wildcards `wild_key` matches `key`, as
+    :meth:`RuleTree.expand_key` would."""
+    wild_parts = wild_key.split('.')
+    parts = key.split('.')
+    return len(wild_parts) == len(parts) and \
+        all(w in ('*', p) for w, p in zip(wild_parts, parts))
+
+
+class ApplyCache(object):
+    """Keys of the ProgDefs applied by the previous runs."""
+    version = 3
+
+    def __init__(self, entries=None):
+        """:param dict entries: ``{ProgDef name: {'key': key, 'keys':
+            [theme key]}}`` of the previous runs, `keys` being the keys of
+            the rules of the ProgDef
+        """
+        self.logger = logger
+        self.entries = entries or {}
+        self.hits = []
+        self.misses = []
+        self.pending = {}  # {ProgDef name: theme}, to be updated
+
+    def __repr__(self):
+        return self.__class__.__name__ + '(%s entries)' % len(self.entries)
+
+    @classmethod
+    def get_cache_path(cls):
+        return os.path.join(utils.get_cache_dir(), 'apply.json')
+
+    @classmethod
+    def load(cls):
+        """Return the cache saved by the previous runs."""
+        try:
+            with open(cls.get_cache_path()) as f:
+                cache = json.load(f)
+            if cache.get('version') == cls.version:
+                return cls(cache['entries'])
+        except (OSError, ValueError, KeyError):
+            pass
+        return cls()
+
+    def save(self):
+        try:
+            utils.save_json(self.get_cache_path(),
+                            {'version': self.version, 'entries': self.entries})
+        except OSError as e:
+            self.logger.warning('Could not save apply cache: %s', e)
+
+    @staticmethod
+    def get_theme_hash(theme, keys):
+        """Return the hash of the values of `theme` set for `keys`.
+
+        `theme` is the ``{section: {key: string}}`` dictionary of the theme
+        file and `keys` are the keys of the rules of a ProgDef. Values set
+        for wildcard keys matching one of them are hashed too, as well as
+        values overridden by a later section and the values of the keys
+        their expressions refer to (see :mod:`Progs.expr`).
+        """
+        from . import expr
+        theme_keys = {key for section in theme.values() for key in section}
+        keys = set(keys)
+        used = {key for key in theme_keys if key in keys or (
+            '*' in key and any(match_key(key, k) for k in keys))}
+
+        todo = list(used)
+        while todo:
+            key = todo.pop()
+            for section in theme.values():
+                val = section.get(key)
+                if val is None or not expr.is_expression(val, theme_keys):
+                    continue
+                try:
+                    refs = {ref.key for ref in expr.parse(val).get_refs()}
+                except ValueError:
+                    continue  # reported when the theme is parsed
+                todo.extend(refs - used)
+                used.update(refs)
+
+        return utils.hash_text(repr([
+            (section_id, key, val) for section_id, section in theme.items()
+            for key, val in section.items() if key in used]))
+
+    @staticmethod
+    def get_key(pd, theme_hash):
+        """Return the key of `pd` applying the theme of hash `theme_hash`."""
+        def stat(path):
+            try:
+                st = os.stat(path)
+            except OSError:
+                return (path, None)
+            return (path, st.st_mtime_ns, st.st_size, st.st_ino)
+
+        # by path, whether or not the modules are imported yet
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        modules = {c.__module__[len('Progs.'):] for c in type(pd).__mro__
+                   if c.__module__.startswith('Progs.')}
+        modules.update(core_modules)
+        code = [stat(os.path.join(package_dir, m + '.py'))
+                for m in sorted(modules)]
+        files = [stat(os.path.realpath(path)) for path in
+                 sorted({pd.get_file_path(), pd.get_out_file_path()})]
+        return utils.hash_text(json.dumps([theme_hash, code, files]))
+
+    def filter(self, prog_defs, theme):
+        """Return the ProgDefs of `prog_defs` that have to be applied.
+
+        `theme` is the ``{section: {key: string}}`` dictionary of the theme
+        file. ProgDefs whose `cacheable` attribute is False are always
+        applied.
+        """
+        out = []
+        for pd in prog_defs:
+            if not pd.cacheable:
+                out.append(pd)
+                continue
+            name = pd.get_name()
+            entry = self.entries.get(name)
+            if entry is not None and entry['key'] == self.get_key(
+                    pd, self.get_theme_hash(theme, entry['keys'])):
+                self.logger.info('Program \'%s\' is up to date, skipping it',
+                                 name)
+                self.hits.append(name)
+            else:
+                self.misses.append(name)
+                self.pending[name] = theme
+                out.append(pd)
+        return out
+
+    def update(self, prog_defs):
+        """Save the keys of the ProgDefs of `prog_defs`, once applied."""
+        for pd in prog_defs:
+            theme = self.pending.pop(pd.get_name(), None)
+            if theme is None:
+                continue
+            config = pd.get_config()
+            config.get_leaves()
+            keys = sorted(config.key_index)
+            self.entries[pd.get_name()] = {
+                'key': self.get_key(pd, self.get_theme_hash(theme, keys)),
+                'keys': keys}
+        self.save()
+
+    def report(self):
+        self.logger.info('Apply cache: %s hit(s), %s miss(es)',
+                         len(self.hits), len(self.misses))
+        self.logger.debug('Apply cache hits: %s, misses: %s',
+                          self.hits, self.misses)
@@ -2,6 +2,7 @@
 """
 
 
+import bisect
 import logging
 logger = logging.getLogger('Systhemer.Progs.common')
 Settings = None
@@ -10,6 +11,9 @@ Settings = None
 class utils(object):
     """Namespace for basic utilities.
     """
+    rgx_cache = {}
+    rgx_stats = {'hits': 0, 'misses': 0}
+
     @staticmethod
     def get_home_dir():
         """Get home directory for the user.
@@ -17,6 +21,102 @@ class utils(object):
         from os.path import expanduser
         return expanduser('~')
 
+    @staticmethod
+    def get_cache_dir():
+        """Get the cache directory of Systhemer.
+        """
+        import os
+        xdg_cache = os.environ.get('XDG_CACHE_HOME')
+        return os.path.join(xdg_cache or
+                            os.path.join(utils.get_home_dir(), '.cache'),
+                            'systhemer')
+
+    @staticmethod
+    def save_json(path, data):
+        """Write `data` as JSON to `path`, creating its directory.
+
+        The file is written next to `path` and renamed over it, so that
+        concurrent runs never read a partial file. Raises OSError.
+        """
+        import json
+        import os
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.%s.tmp' % os.getpid()
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    # probes for files, see list_dir
+    probe_dirs = {}   # {dirpath: (mtime, {name: os.DirEntry})}
+    probe_which = {}  # {(PATH, name): path or None}
+
+    @staticmethod
+    def list_dir(dir_path):
+        """Return the entries of `dir_path` as a dict of `os.DirEntry`.
+
+        Each directory is scanned once with `os.scandir`, the listing is
+        then cached until :meth:`refresh_probes` finds that the mtime of
+        the directory changed. Missing directories have no entries.
+        """
+        import os
+        if dir_path not in utils.probe_dirs:
+            try:
+                mtime = os.stat(dir_path).st_mtime_ns
+                with os.scandir(dir_path) as it:
+                    entries = {e.name: e for e in it}
+            except OSError:
+                mtime, entries = None, {}
+            utils.probe_dirs[dir_path] = (mtime, entries)
+        return utils.probe_dirs[dir_path][1]
+
+    @staticmethod
+    def refresh_probes():
+        """Drop the cached listings of the directories that changed.
+        """
+        import os
+        changed = 0
+        for dir_path, (mtime, _) in list(utils.probe_dirs.items()):
+            try:
+                new_mtime = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                new_mtime = None
+            if new_mtime != mtime:
+                del utils.probe_dirs[dir_path]
+                changed += 1
+        utils.probe_which.clear()
+        logger.debug('file probes refreshed, %s of %s directories changed',
+                     changed, changed + len(utils.probe_dirs))
+
+    @staticmethod
+    def which(name):
+        """Return the path of the executable `name` in the PATH, or None.
+
+        Answers are cached per PATH, see :meth:`list_dir`.
+        """
+        import os
+        path = os.environ.get('PATH', os.defpath)
+        if (path, name) not in utils.probe_which:
+            found = None
+            for dir_path in filter(None, path.split(os.pathsep)):
+                entry = utils.list_dir(dir_path).get(name)
+                if entry is not None and entry.is_file() and \
+                   os.access(entry.path, os.X_OK):
+                    found = entry.path
+                    break
+            utils.probe_which[(path, name)] = found
+        return utils.probe_which[(path, name)]
+
+    @staticmethod
+    def isfile(file_path):
+        """Return whether `file_path` is a file, like `os.path.isfile`.
+
+        The listing of its directory is cached, see :meth:`list_dir`.
+        """
+        import os
+        dir_path, name = os.path.split(os.path.abspath(file_path))
+        entry = utils.list_dir(dir_path).get(name)
+        return entry is not None and entry.is_file()
+
     @staticmethod
     def get_setting(setting, default=None, critical=True, msg=None):
         """Get a setting from self.Settings.
@@ -29,10 +129,90 @@ class utils(object):
                 logger.critical(msg)
                 exit(1)
             else:
-                logger.error(msg + ' Returning \'None\'.', setting)
+                logger.error(msg + ' Returning %s.', repr(default))
                 return default
         return value
 
+    @staticmethod
+    def colors_enabled():
+        """Return whether output is colored, like the console log.
+
+        Colors need colorlog, which is imported on first use: if it is not
+        installed, the `no_colorlog` setting is set.
+        """
+        if getattr(Settings, 'no_colorlog', False):
+            return False
+        try:
+            import colorlog  # noqa: F401
+        except ImportError:
+            Settings.no_colorlog = True
+            return False
+        return True
+
+    match_policies = ('first', 'last', 'all')
+    fsync_pending_dirs = set()
+
+    @staticmethod
+    def check_match_policy(policy):
+        """Exit if `policy` isn't a valid match policy.
+
+        A match policy is one of ``'first'``, ``'last'``, ``'all'`` or the
+        1-based number of the match to use.
+        """
+        if policy not in utils.match_policies and \
+           not (type(policy) is int and policy > 0):
+            logger.critical('Invalid match policy: %s', repr(policy))
+            exit(1)
+
+    @staticmethod
+    def select_matches(matches, policy):
+        """Return the list of `matches` selected by the match `policy`."""
+        if policy == 'first':
+            return matches[:1]
+        if policy == 'last':
+            return matches[-1:]
+        if policy == 'all':
+            return matches
+        return matches[policy-1:policy]
+
+    @staticmethod
+    def compile_rgx(pattern, flags=0):
+        """Return `pattern` compiled, compiling it only once per run.
+
+        Unlike the small module-level cache of :mod:`regex`, compiled
+        patterns are kept for the whole run. ``utils.rgx_stats`` counts
+        cache hits and misses (i.e. compilations).
+        """
+        import regex
+        key = (pattern, flags)
+        try:
+            compiled = utils.rgx_cache[key]
+            utils.rgx_stats['hits'] += 1
+        except KeyError:
+            compiled = utils.rgx_cache[key] = regex.compile(pattern, flags)
+            utils.rgx_stats['misses'] += 1
+        return compiled
+
+    @staticmethod
+    def hash_text(text):
+        """Return the hash of `text`, to check files for changes."""
+        import hashlib
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    @staticmethod
+    def fsync_dirs():
+        """Sync the directories of the files saved with the `fsync` setting.
+
+        Each directory is synced once, after all files are saved.
+        """
+        import os
+        while utils.fsync_pending_dirs:
+            dir_fd = os.open(utils.fsync_pending_dirs.pop(), os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
     @staticmethod
     def is_excluded(exclude_rule, check_range):
         """ Check if the given range is within the exclude rule.
@@ -54,17 +234,120 @@ class utils(object):
                             ' Startpos is bigger than endpos!')
             exit(1)
 
-        exclude_range = range(exclude_rule[1], exclude_rule[2]+1)
+        start_in = exclude_rule[1] <= check_range[0] <= exclude_rule[2]
+        end_in = exclude_rule[1] <= check_range[1] <= exclude_rule[2]
 
         # if range is completely within the exclude range
-        if (check_range[0] in exclude_range) and \
-           (check_range[1] in exclude_range):
+        if start_in and end_in:
             return 1
 
         # if range is partially within the exclude range
-        if (check_range[0] in exclude_range) or \
-           (check_range[1] in exclude_range):
+        if start_in or end_in:
             return 2
 
         # if range is not in the exclude range at all
         return 0
+
+
+class ExcludeIndex(object):
+    """Sorted interval index of exclude rules.
+
+    Answers the same question as :meth:`utils.is_excluded` for a whole
+    list of exclude rules by bisection instead of a linear scan.
+    Intervals contained in another one cannot change the answer and are
+    dropped, so the remaining ones are sorted by both start and end
+    position.
+
+    ``ExcludeIndex.stats`` counts the queries, the comparisons made and
+    the ones avoided compared to checking every exclude rule.
+    """
+    stats = {'queries': 0, 'comparisons': 0, 'avoided': 0}
+
+    def __init__(self, exclude_rules=()):
+        """Build the index.
+
+        :param list exclude_rules: (depth, startpos, endpos) tuples
+        """
+        self.rules = list(exclude_rules)
+        self.starts = []
+        self.ends = []
+        for _, start, end in sorted(self.rules, key=lambda r: (r[1], -r[2])):
+            # skip intervals contained in the previous one
+            if self.ends and end <= self.ends[-1]:
+                continue
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def __repr__(self):
+        return self.__class__.__name__ + '(%s)' % self.rules
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def _count(self, linear, comparisons):
+        ExcludeIndex.stats['queries'] += 1
+        ExcludeIndex.stats['comparisons'] += comparisons
+        ExcludeIndex.stats['avoided'] += linear - comparisons
+
+    def _contains(self, pos):
+        # the last interval starting before `pos` ends the furthest
+        i = bisect.bisect_right(self.starts, pos) - 1
+        return i >= 0 and pos <= self.ends[i], i
+
+    def is_excluded(self, check_range):
+        """Check if the given range is within any exclude rule.
+
+        :param tuple check_range:  (startpos, endpos)
+
+        :return: same as :meth:`utils.is_excluded`
+        """
+        if check_range[0] > check_range[1]:
+            logger = logging.getLogger('Systhemer.common.utils')
+            logger.critical('Range makes no sense!'
+                            ' Startpos is bigger than endpos!')
+            exit(1)
+
+        # a linear scan makes 4 comparisons per exclude rule
+        self._count(4 * len(self.rules),
+                    2 * len(self.starts).bit_length() + 4)
+
+        start_in, i = self._contains(check_range[0])
+        if start_in and check_range[1] <= self.ends[i]:
+            return 1
+        if start_in or self._contains(check_range[1])[0]:
+            return 2
+        return 0
+
+    def filter(self, matches, offset=0):
+        """Return the matches that are not excluded at all.
+
+        :param matches: match objects sorted by position and not
+            overlapping (e.g. from ``finditer``)
+        :param int offset: offset to add to the positions of the matches
+        """
+        if not self.starts:
+            return list(matches)
+
+        out = []
+        n = len(self.starts)
+        i = j = 0
+        comparisons = 0
+        for m in matches:
+            start, end = m.start() + offset, m.end() + offset
+            # first intervals not ending before the start and the end
+            while i < n and self.ends[i] < start:
+                i += 1
+            while j < n and self.ends[j] < end:
+                j += 1
+            comparisons += 4
+
+            if (i < n and self.starts[i] <= start) or \
+               (j < n and self.starts[j] <= end):
+                continue
+            out.append(m)
+
+        self._count(comparisons * len(self.rules), comparisons + i + j)
+        return out
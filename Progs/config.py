@@ -9,17 +9,26 @@ Classes:
     * :class:`Rule` - A single rule defined using regex
     * :class:`RuleVLen` - Like `Rule` but of variable length
     * :class:`Section` - Section of file to isolate from the rest
+    * :class:`Edit` - Replacement computed by a rule
 """
 
 
-import regex
 import logging
+from collections import namedtuple
 from . import common
-from .common import utils
+from .common import utils, ExcludeIndex
 from . import value as value_
 logger = logging.getLogger('Systhemer.Progs.common')
 
 
+Edit = namedtuple('Edit', ['start', 'end', 'text', 'key', 'rule'])
+Edit.__doc__ = """Replacement of the span (start, end) of a buffer by text.
+
+Emitted by `rule` for `key`. Positions are absolute positions in the
+buffer the edit was computed against.
+"""
+
+
 class ConfigElement(object):
     parent = None
     tree = None
@@ -82,6 +91,8 @@ class RuleTree(ConfigElement):
 
         self.logger = logger
         self.leaves = None
+        self.key_index = None
+        self.key_trie = None
         self.rules = args
         for r in self.rules:
             r.parent = self
@@ -121,8 +132,52 @@ class RuleTree(ConfigElement):
         self.leaves = self._get_leaves(self)
         self.logger.log(common.Settings.VDEBUG, 'leaves list generated: %s',
                         self.leaves)
+        self.build_key_index()
         return self.leaves
 
+    def build_key_index(self):
+        """Build the key to rules index and the dotted key trie.
+
+        ``self.key_index`` maps every key to the list of leaves that
+        contain it, in tree order. ``self.key_trie`` holds the keys split
+        on ``'.'``, a node's ``None`` entry being the key ending there.
+        """
+        self.key_index = {}
+        self.key_trie = {}
+        for l in self.leaves:
+            for key in l.keys:
+                self.key_index.setdefault(key, []).append(l)
+
+                node = self.key_trie
+                for part in key.split('.'):
+                    node = node.setdefault(part, {})
+                node[None] = key
+
+    def find_rules(self, key):
+        """Return the list of leaves that contain `key`."""
+        self.get_leaves()
+        return self.key_index.get(key, [])
+
+    def expand_key(self, key):
+        """Return the list of keys of the tree matching `key`.
+
+        Every ``'*'`` part of a dotted key matches any single part,
+        e.g.: ``'*.border'`` or ``'urgent.*'``. A key without wildcards
+        expands to itself if it is in the tree.
+        """
+        self.get_leaves()
+        if '*' not in key:
+            return [key] if key in self.key_index else []
+
+        nodes = [self.key_trie]
+        for part in key.split('.'):
+            if part == '*':
+                nodes = [n for node in nodes
+                         for p, n in node.items() if p is not None]
+            else:
+                nodes = [node[part] for node in nodes if part in node]
+        return [node[None] for node in nodes if None in node]
+
     def get_leaves(self, force_rebuild=False):
         """Build the array of leaves if not already built and return it.
         """
@@ -145,7 +200,7 @@ class Rule(ConfigElement):
     This :class:`Rule` only works if the line of the regex is fixed.
     If not, use the :class:`RuleVLen` class.
     """
-    def __init__(self, rule, keys):
+    def __init__(self, rule, keys, match='first'):
         """Build the :class:`Rule` object.
 
         Example::
@@ -162,6 +217,11 @@ class Rule(ConfigElement):
 
                 * Key: variable from global config file to be used
                 * Value: number specifying the capture group
+
+        :param match: which matches of the scope to set: ``'first'``,
+            ``'last'``, ``'all'`` or the 1-based number of the match.
+            Can also be a dictionary of these for each key (``'first'``
+            for missing keys)
         """
         self.rule = rule
         # self.keys = keys
@@ -169,6 +229,7 @@ class Rule(ConfigElement):
         self.sub_ids = keys
         self.logger = logging.getLogger('Systhemer.Progs.common.'
                                         + self.__class__.__name__)
+        self.set_match_policy(match)
         self.build_rule_rgx()
         self.build_formats()
 
@@ -179,6 +240,19 @@ class Rule(ConfigElement):
     def __str__(self):
         return self.__class__.__name__
 
+    def set_match_policy(self, match):
+        """Set the match policy of the rule (see :meth:`__init__`)."""
+        policies = match.values() if isinstance(match, dict) else [match]
+        for policy in policies:
+            utils.check_match_policy(policy)
+        self.match = match
+
+    def get_match_policy(self, key):
+        """Return the match policy for `key`."""
+        if isinstance(self.match, dict):
+            return self.match.get(key, 'first')
+        return self.match
+
     def build_rule_rgx(self):
         """Build rule regexpr."""
         rule = ''
@@ -192,6 +266,7 @@ class Rule(ConfigElement):
                 exit(1)
 
         self.rule_rgx = rule
+        self.rule_re = utils.compile_rgx(rule)
 
     def build_formats(self):
         formats = []
@@ -207,71 +282,91 @@ class Rule(ConfigElement):
         """
         # Construct a list of all matches of 'rule' in the proper scope that
         # aren't excluded by any of the rules in exclude_ranges
-        matches = []
+        if not isinstance(exclude_ranges, ExcludeIndex):
+            exclude_ranges = ExcludeIndex(exclude_ranges)
 
         scoped_buffer = _buffer[scope_range[0]:scope_range[1]]
 
-        for m in regex.finditer(self.rule_rgx, scoped_buffer):
-            for r in exclude_ranges:
-                # check is range excludes match
-                # compensating also for scope offset of match
-                if utils.is_excluded(r, (m.start()+scope_range[0],
-                                         m.end()+scope_range[0])):
-                    break
-
-            # if loop ran with no `break`
-            else:
-                matches.append(m)
-
-        return matches
+        # compensating for scope offset of matches
+        return exclude_ranges.filter(self.rule_re.finditer(scoped_buffer),
+                                     scope_range[0])
 
     def _set(self, key, value, _buffer, scope_range, exclude_ranges):
-        # apply rule rgx and get non-excluded matches
+        """Return the list of :class:`Edit` setting `value` to `key`."""
+        return self.get_edits([(key, value)], _buffer, scope_range,
+                              exclude_ranges)
+
+    def get_edits(self, key_vals, _buffer, scope_range, exclude_ranges,
+                  policies=None):
+        """Return the list of :class:`Edit` for every ``(key, value)`` pair.
+
+        The regex is applied once for all of `key_vals` and each key is
+        set in the matches selected by its match policy. `_buffer` is only
+        read, so edits for many rules can be computed against the same
+        snapshot of a buffer, in any order.
+
+        `policies` overrides the match policies, as a ``{key: policy}``
+        dictionary, None selecting no match (see :mod:`Progs.stream`).
+        Keys not found are then not reported.
+        """
         matches = self.get_matches(_buffer, scope_range, exclude_ranges)
 
-        # check if empty list
-        try:
-            # for now, we only apply the value to the first key match.
-
-            # TODO: use all of `matches`
-            match = matches[0]
-        except IndexError:
-            self.logger.warning('Found rule \'%s\' in program definition'
-                                ' but not in configuration file!', key)
-            return None
-
-        sub_id = self.sub_ids[key]
+        out = []
+        for key, value in key_vals:
+            if policies is None:
+                selected = utils.select_matches(matches,
+                                                self.get_match_policy(key))
+            elif policies[key] is not None:
+                selected = utils.select_matches(matches, policies[key])
+            else:
+                continue
+
+            spans = []
+            for match in selected:
+                try:
+                    spans.append(self.get_span(key, match, scope_range[0]))
+                except IndexError:
+                    # capture not repeated enough times in this match
+                    continue
+            if not spans:
+                if policies is None:
+                    self.logger.warning('Found rule \'%s\' in program '
+                                        'definition but not in '
+                                        'configuration file!', key)
+                continue
+
+            fmatted_val = self.format_value(key, value)
+            for start, end in spans:
+                out.append(Edit(start, end, fmatted_val, key, self))
+            self.logger.debug('Value set: %s <- %s (%s edits)',
+                              key, value, len(spans))
+        return out
 
-        # format value object
-        fmatted_val = self.formats[sub_id-1].format(value)
+    def format_value(self, key, value):
+        """Format `value` with the formatter of `key`'s capture group."""
+        # expressions are only evaluated once a rule uses them
+        fmatted_val = self.get_key_formatter(key).format(value.evaluate())
         self.logger.log(common.Settings.VDEBUG,
                         'value formatted: %s', fmatted_val)
+        return fmatted_val
 
-        # replace the value in the buffer and return it
-        offset = scope_range[0]
-        out_buffer = self.gen_new_buffer(
-            key, fmatted_val, _buffer, match, offset
-        )
-        self.logger.debug('Value set: %s <- %s', key, value)
-        return out_buffer
-
-    def gen_new_buffer(self, key, raw_val, _buffer, match, offset):
+    def get_span(self, key, match, offset):
+        """Return the absolute (startpos, endpos) of `key` in `match`."""
         sub_id = self.sub_ids[key]
+        return (offset+match.start(sub_id), offset+match.end(sub_id))
 
-        out_buffer \
-            = _buffer[:offset+match.start(sub_id)] \
-            + raw_val\
-            + _buffer[offset+match.end(sub_id):]
-        return out_buffer
+    def get_key_formatter(self, key):
+        """Return the formatter of `key`'s capture group."""
+        return self.formats[self.sub_ids[key]-1]
 
     def get_key_type(self, key):
-        return self.formats[self.sub_ids[key]-1].get_type()
+        return self.get_key_formatter(key).get_type()
 
 
 class RuleVLen(Rule):
     """Similar to the `Rule` class, supports variable length matching
     """
-    def __init__(self, rule, keys):
+    def __init__(self, rule, keys, match='first'):
         """Build a `RuleVLen` object
 
         Example::
@@ -298,6 +393,8 @@ class RuleVLen(Rule):
                     * number specifying the capture id of that group
                     * string specifying default value
                       (yes this is necessary)
+
+        :param match: same as for :class:`Rule`
         """
         self.rule = rule
         self.keys = keys.keys()
@@ -305,19 +402,17 @@ class RuleVLen(Rule):
         self.sub_sub_ids = {k: v[1] for k, v in keys.items()}
         self.logger = logging.getLogger('Systhemer.Progs.common.'
                                         + self.__class__.__name__)
+        self.set_match_policy(match)
         self.build_rule_rgx()
         self.build_formats()
 
-    def gen_new_buffer(self, key, raw_val, _buffer, match, offset):
+    def get_span(self, key, match, offset):
         # -1 for consistency with sub_id 1-based numbering
         sub_id = self.sub_ids[key]
         sub_sub_id = self.sub_sub_ids[key]-1
 
-        out_buffer \
-            = _buffer[:offset+match.starts(sub_id)[sub_sub_id]] \
-            + raw_val \
-            + _buffer[offset+match.ends(sub_id)[sub_sub_id]:]
-        return out_buffer
+        return (offset+match.starts(sub_id)[sub_sub_id],
+                offset+match.ends(sub_id)[sub_sub_id])
 
 
 class Section(ConfigElement):
@@ -335,7 +430,7 @@ class Section(ConfigElement):
     this is necessary for Systhemer to understand scopes
     """
     def __init__(self, name, startchar, endchar, *rules,
-                 separator=r'[ \t\n]*'):
+                 separator=r'[ \t\n]*', match='first'):
         """Build a `Section` object
 
         Example::
@@ -352,23 +447,31 @@ class Section(ConfigElement):
         :param variadic \*rules: same structure as a RuleTree, defined above
         :param str separator: whatever is between sub_name and
             ``{`` (``' '`` in this case)
+        :param match: which of the matching sections of the parent scope
+            to use: ``'first'``, ``'last'``, ``'all'`` or the 1-based
+            number of the section
         """
+        utils.check_match_policy(match)
 
         self.name = name
         self.startchar = startchar
         self.rules = rules
         self.endchar = endchar
         self.separator = separator
+        self.match = match
+        self.header_re = utils.compile_rgx(name + separator + startchar)
+        self.delims_re = utils.compile_rgx('(?P<start>%s)|(?P<end>%s)'
+                                           % (startchar, endchar))
         for rule in self.rules:
             rule.parent = self
 
     def __repr__(self):
         return self.__class__.__name__ \
-            + '(%s, %s, %s, %s, separator=%s)' \
+            + '(%s, %s, %s, %s, separator=%s, match=%s)' \
             % (self.name.__repr__(), self.startchar.__repr__(),
                self.endchar.__repr__(),
                ', '.join([r.__repr__() for r in self.rules]),
-               self.separator.__repr__())
+               self.separator.__repr__(), self.match.__repr__())
 
     def __str__(self):
         return 'r\'%s\' \'%s\' \'%s\'' \
@@ -382,3 +485,10 @@ class Section(ConfigElement):
 
     def __getitem__(self, key):
         return self.rules[key]
+
+    def get_signature(self):
+        """Return the tuple identifying the text this section matches.
+
+        Sections with the same signature match the same blocks.
+        """
+        return (self.name, self.separator, self.startchar, self.endchar)
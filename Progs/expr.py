@@ -0,0 +1,267 @@
+"""Derived theme values.
+
+A theme value can be an expression computing a color from other keys of
+the theme, e.g.::
+
+    [theme]
+    accent = #3daee9
+    focused.border = lighten(accent, 0.2)
+    urgent.background = mix(background, #ff0000, 0.5)
+    unfocused.border = accent
+
+An expression is a function call or the name of another key of the theme.
+Function arguments are other expressions, color litterals (any
+:class:`~Progs.value.Color` format), numbers or references to theme keys.
+A key is looked up in the section of the expression first, then in the
+other sections (the last one defining it wins).
+
+Expressions are :class:`~Progs.value.Value` objects evaluated lazily:
+nothing is computed until a rule formats the value (see
+:meth:`Value.evaluate`), and every node is computed once. References are
+resolved, and cycles reported, when the theme is loaded (see :func:`link`).
+
+Classes:
+    * :class:`Expression` - Base class, a lazily evaluated value
+    * :class:`Call` - Function applied to expressions
+    * :class:`Ref` - Reference to the value of another key
+
+Functions:
+    * :func:`is_expression` - Whether a theme value is an expression
+    * :func:`parse` - Parse an expression
+    * :func:`link` - Resolve the references of the expressions of a theme
+"""
+
+
+import logging
+import regex as re
+from .value import Value, Color, Litteral
+logger = logging.getLogger('Systhemer.Progs.expr')
+
+
+# {name: (function, number of color arguments, min and max number of
+# arguments)}, color arguments coming first
+functions = {
+    'lighten': (Color.lighten, 1, 2, 2),
+    'darken': (Color.darken, 1, 2, 2),
+    'mix': (Color.mix, 2, 2, 3),
+    'alpha': (Color.alpha, 1, 2, 2),
+}
+
+call_re = re.compile(r'\s*(%s)\s*\(' % '|'.join(functions))
+token_re = re.compile(r'''\s*(?:
+    (?P<color>\#[0-9a-fA-F]+|rgb(?:\.f)?\([^()]*\))|
+    (?P<num>[+-]?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+))(?![\w.])|
+    (?P<name>[A-Za-z_][\w.-]*)|
+    (?P<punct>[(),])|
+    (?P<end>$))''', re.VERBOSE)
+
+
+class Expression(Value):
+    """A value computed from other values when first needed."""
+    def __init__(self, text):
+        self.text = text
+        self.value = None
+
+    def __repr__(self):
+        return self.__class__.__name__ + '(\'%s\')' % self.text
+
+    def __str__(self):
+        return repr(self)
+
+    def evaluate(self):
+        """Return the computed value, computing it on the first call."""
+        if self.value is None:
+            self.value = self.compute()
+        return self.value
+
+    def compute(self):
+        """Must be implemented"""
+        raise NotImplementedError()
+
+    def get_refs(self):
+        """Yield the :class:`Ref` objects of the expression."""
+        return iter(())
+
+    def format(self, fmat, pipeline=False):
+        return self.evaluate().format(fmat, pipeline=pipeline)
+
+
+class Ref(Expression):
+    """Reference to the value of the key `key`, set by :func:`link`."""
+    def __init__(self, key):
+        super().__init__(key)
+        self.key = key
+        self.target = None
+
+    def compute(self):
+        value = self.target.evaluate()
+        # keys that no ProgDef knows hold litterals
+        if isinstance(value, Litteral):
+            try:
+                return Color.Formatter.auto_parse(value.s)
+            except (AttributeError, ValueError):
+                logger.critical('Key \'%s\' is not a color: \'%s\'',
+                                self.key, value.s)
+                exit(1)
+        return value
+
+    def get_refs(self):
+        yield self
+
+
+class Call(Expression):
+    """Call of the function `name` of :data:`functions` with `args`."""
+    def __init__(self, text, name, args):
+        super().__init__(text)
+        self.name = name
+        self.args = args
+
+    def compute(self):
+        func, n_colors = functions[self.name][:2]
+        args = [arg.evaluate() if isinstance(arg, Value) else arg
+                for arg in self.args]
+        for i, arg in enumerate(args):
+            if (i < n_colors) != isinstance(arg, Color):
+                logger.critical('Argument %s of %s() must be a %s: %s',
+                                i + 1, self.name,
+                                'color' if i < n_colors else 'number',
+                                self.text)
+                exit(1)
+        return func(*args)
+
+    def get_refs(self):
+        for arg in self.args:
+            if isinstance(arg, Expression):
+                yield from arg.get_refs()
+
+
+def is_expression(string, keys=()):
+    """Return whether the theme value `string` is an expression: a function
+    call, or the name of a key of `keys` (the keys of the theme)."""
+    return call_re.match(string) is not None or string.strip() in keys
+
+
+def parse(string):
+    """Return the :class:`Expression` of `string`.
+
+    Raises ValueError if `string` is not a valid expression.
+    """
+    tokens = []
+    pos = 0
+    while True:
+        m = token_re.match(string, pos)
+        if m is None:
+            raise ValueError('Invalid expression at \'%s\'' % string[pos:])
+        if m.lastgroup == 'end':
+            break
+        tokens.append((m.lastgroup, m.group(m.lastgroup),
+                       m.start(m.lastgroup), m.end()))
+        pos = m.end()
+
+    def parse_arg(i):
+        """Return the (argument, index of the next token) at `i`."""
+        kind, tok = tokens[i][:2] if i < len(tokens) else ('end', '')
+        if kind == 'color':
+            try:
+                return Color.Formatter.auto_parse(tok), i + 1
+            except (AttributeError, ValueError):
+                raise ValueError('Invalid color \'%s\'' % tok)
+        if kind == 'num':
+            return float(tok), i + 1
+        if kind == 'name' and is_punct(i + 1, '('):
+            return parse_call(i)
+        if kind == 'name':
+            return Ref(tok), i + 1
+        raise ValueError('Unexpected \'%s\'' % (tok or 'end'))
+
+    def is_punct(i, char):
+        return i < len(tokens) and tokens[i][:2] == ('punct', char)
+
+    def parse_call(i):
+        start = i
+        name = tokens[i][1]
+        if tokens[i][0] != 'name' or not is_punct(i + 1, '('):
+            raise ValueError('Expected a function call at \'%s\'' % name)
+        if name not in functions:
+            raise ValueError('Unknown function \'%s\'' % name)
+        args = []
+        i += 2
+        while not is_punct(i, ')'):
+            if args:
+                if not is_punct(i, ','):
+                    raise ValueError('Expected \',\' or \')\' in %s()'
+                                     % name)
+                i += 1
+            arg, i = parse_arg(i)
+            args.append(arg)
+        min_args, max_args = functions[name][2:]
+        if not min_args <= len(args) <= max_args:
+            raise ValueError('%s() takes %s arguments' % (name, (
+                min_args if min_args == max_args else
+                '%s to %s' % (min_args, max_args))))
+        text = string[tokens[start][2]:tokens[i][3]].strip()
+        return Call(text, name, args), i + 1
+
+    if not tokens:
+        raise ValueError('Empty expression')
+    if tokens[0][0] == 'name' and not is_punct(1, '('):
+        expression, i = Ref(tokens[0][1]), 1
+    else:
+        expression, i = parse_call(0)
+    if i != len(tokens):
+        raise ValueError('Unexpected \'%s\'' % tokens[i][1])
+    return expression
+
+
+def link(values):
+    """Resolve the references of the expressions of `values`.
+
+    `values` is a ``{section: {key: value}}`` dictionary. Exits if a key
+    is not found or if expressions depend on each other in a cycle.
+
+    Returns the keys the expressions depend on, as a
+    ``{(section, key): [(section, key)]}`` dictionary.
+    """
+    deps = {}  # {(section, key): [(section, key)]}
+    for section_id, section in values.items():
+        for key, val in section.items():
+            if not isinstance(val, Expression):
+                continue
+            deps[(section_id, key)] = []
+            for ref in val.get_refs():
+                sections = [s for s in values if ref.key in values[s]]
+                if ref.key in section:
+                    dep = (section_id, ref.key)
+                elif sections:
+                    dep = (sections[-1], ref.key)
+                else:
+                    logger.critical('Key \'%s\' of \'%s\' not found: %s',
+                                    ref.key, key, val.text)
+                    exit(1)
+                ref.target = values[dep[0]][dep[1]]
+                deps[(section_id, key)].append(dep)
+
+    # depth first search, `path` being the keys being visited
+    done = set()
+    for node in deps:
+        if node in done:
+            continue
+        path = [node]
+        stack = [(node, iter(deps[node]))]
+        while stack:
+            current, children = stack[-1]
+            for child in children:
+                if child in path:
+                    cycle = path[path.index(child):] + [child]
+                    logger.critical('Cycle in theme expressions: %s',
+                                    ' -> '.join(k for s, k in cycle))
+                    exit(1)
+                if child in deps and child not in done:
+                    stack.append((child, iter(deps[child])))
+                    path.append(child)
+                    break
+            else:
+                done.add(current)
+                stack.pop()
+                path.pop()
+    return deps
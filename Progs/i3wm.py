@@ -6,6 +6,7 @@ from .common import utils
 
 class i3wm(ProgDef):
     """describes i3wm"""
+    binary = 'i3'
 
     def init(self):
         space = r'[ \t]+'
@@ -65,16 +66,6 @@ class i3wm(ProgDef):
                                 'testval3': 1})))
         )
 
-    def is_installed(self):
-        # TODO figure out a better way of doing this that actually works
-        import os
-
-        for p in os.getenv('PATH').split(':'):
-            if os.path.isfile(p + '/i3'):
-                return True
-
-        return False
-
     def get_default_path(self):
         import os
         xdg_home = os.environ.get('XDG_CONFIG_HOME')
@@ -82,15 +73,15 @@ class i3wm(ProgDef):
                 utils.get_home_dir() + '/.i3/config']
 
         for p in [d for d in dirs if d]:
-            if os.path.isfile(p):
+            if utils.isfile(p):
                 return p
 
         return None
 
-    def save(self):  # saves in a new file for testing purposes
+    def get_out_file_path(self):  # a new file for testing purposes
+        return utils.get_setting('i3wm_out_file_path',
+                                 utils.get_setting('i3wm_file_path'))
+
+    def save(self):
         """save file"""
-        outfile = utils.get_setting('i3wm_out_file_path',
-                                    utils.get_setting('i3wm_file_path'))
-        self.logger.info('Saving to %s...', outfile)
-        with open(outfile, 'w') as newfile:
-            newfile.write(self.get_file_buffer())
+        return self.write_file(self.get_out_file_path())
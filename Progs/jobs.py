@@ -0,0 +1,175 @@
+"""Applying themes to many programs, in order or in parallel.
+
+Each :class:`~Progs.template.ProgDef` works on its own file, so they
+are independent of each other and can be applied in worker processes,
+or in this process with their file I/O overlapped (see :mod:`Progs.aio`).
+
+Functions:
+    * :func:`apply_prog` - Apply and save the theme for one program
+    * :func:`run_jobs_async` - Apply and save the theme for many programs
+    * :func:`run_jobs` - Synchronous wrapper of :func:`run_jobs_async`
+"""
+
+
+import asyncio
+import contextlib
+import io
+import logging
+import time
+from . import common
+from . import aio
+from .common import utils
+logger = logging.getLogger('Systhemer.Progs.jobs')
+
+
+def apply_prog(pd, values):
+    """Apply `values` to the ProgDef `pd` and save it.
+
+    Returns the wall time it took, in seconds.
+    """
+    start = time.perf_counter()
+
+    # apply theme to curent program
+    logger.info('Applying theme for program: \'%s\'', pd.get_name())
+
+    # apply all sections at once
+    pd.apply(values)
+
+    # save theme for current program
+    logger.info('Starting save jobs for program: \'%s\'', pd.get_name())
+    pd.do_save()
+
+    return time.perf_counter() - start
+
+
+def snapshot_settings(Settings):
+    """Return the attributes of `Settings`, to send to worker processes."""
+    return {k: v for k, v in vars(Settings).items()
+            if not k.startswith('__')}
+
+
+class _RecordHandler(logging.Handler):
+    """Keep the log records of a job, ready to be sent to the parent."""
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        # args and tracebacks might not be picklable
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.msg += '\n' + logging.Formatter().formatException(
+                record.exc_info)
+            record.exc_info = None
+            record.exc_text = None
+        self.records.append(record)
+
+
+def _init_worker(settings):
+    common.Settings = type('Settings', (), settings)
+    logging.getLogger('Systhemer').setLevel(common.Settings.VDEBUG)
+
+
+def _apply_job(pd, values):
+    # log records and stdout (e.g. diffs) are sent back to the parent,
+    # to be output in order
+    handler = _RecordHandler()
+    logging.getLogger('Systhemer').handlers = [handler]
+    stdout = io.StringIO()
+    status = 0
+    elapsed = None
+
+    with contextlib.redirect_stdout(stdout):
+        try:
+            elapsed = apply_prog(pd, values)
+            utils.fsync_dirs()
+        except SystemExit as e:
+            status = e.code
+        except Exception:
+            logger.exception('Error while applying theme for program:'
+                             ' \'%s\'', pd.get_name())
+            status = 1
+
+    return handler.records, stdout.getvalue(), elapsed, status
+
+
+def _log_done(pd, elapsed):
+    logger.info('Program \'%s\' done in %.3fs', pd.get_name(), elapsed)
+
+
+async def _run_local(prog_defs, values):
+    """Apply and save `values` for `prog_defs` in this process.
+
+    Files are loaded and saved concurrently (see :mod:`Progs.aio`).
+    """
+    await aio.prefetch(prog_defs)
+
+    times = []
+    for pd in prog_defs:
+        start = time.perf_counter()
+        logger.info('Applying theme for program: \'%s\'', pd.get_name())
+        pd.apply(values)
+        times.append(time.perf_counter() - start)
+
+    logger.info('Starting save jobs for %s programs', len(prog_defs))
+    save_times = await aio.save_all(prog_defs)
+    for pd, elapsed, save_elapsed in zip(prog_defs, times, save_times):
+        _log_done(pd, elapsed + save_elapsed)
+
+
+async def _run_pool(prog_defs, values, Settings, jobs):
+    """Apply and save `values` for `prog_defs` in `jobs` processes."""
+    from concurrent.futures import ProcessPoolExecutor
+    logger.info('Applying theme for %s programs with %s jobs',
+                len(prog_defs), jobs)
+    loop = asyncio.get_running_loop()
+    # settings are snapshot after the non-parallel ProgDefs (e.g. `_self`)
+    # had the chance to change them
+    with ProcessPoolExecutor(jobs, initializer=_init_worker,
+                             initargs=(snapshot_settings(Settings),)) \
+            as executor:
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, _apply_job, pd, values)
+              for pd in prog_defs))
+
+    status = 0
+    for pd, (records, output, elapsed, job_status) \
+            in zip(prog_defs, results):
+        for record in records:
+            logging.getLogger(record.name).handle(record)
+        print(output, end='')
+        if elapsed is not None:
+            _log_done(pd, elapsed)
+        status = status or job_status
+    return status
+
+
+async def run_jobs_async(prog_defs, values, Settings, jobs=1):
+    """Apply and save `values` for every ProgDef of `prog_defs`.
+
+    ProgDefs whose `parallel` attribute is False are applied first, one
+    by one. With more than one job, the others are then applied in a
+    pool of `jobs` worker processes; their log records and output are
+    replayed in order, program by program. Otherwise, they are applied
+    in this process with their files loaded and saved concurrently.
+    """
+    for pd in prog_defs:
+        if not pd.parallel:
+            _log_done(pd, apply_prog(pd, values))
+
+    parallel = [pd for pd in prog_defs if pd.parallel]
+    status = 0
+    if jobs > 1 and parallel:
+        status = await _run_pool(parallel, values, Settings, jobs)
+    elif parallel:
+        await _run_local(parallel, values)
+    utils.fsync_dirs()
+
+    if status:
+        exit(status)
+
+
+def run_jobs(prog_defs, values, Settings, jobs=1):
+    """Synchronous wrapper of :func:`run_jobs_async`."""
+    asyncio.run(run_jobs_async(prog_defs, values, Settings, jobs))
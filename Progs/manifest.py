@@ -0,0 +1,185 @@
+"""Manifest of the available program definitions.
+
+A ProgDef is a class named after the module defining it. Importing every
+module of the package to find them is slow, so the modules are parsed
+(not imported) instead, and what is found is cached per module until the
+mtime of the module changes.
+
+Each ProgDef gets an installation probe, found from its class attributes
+without importing it:
+
+    * ``'binary'``: the `binary` class attribute is set, the program is
+      installed if that executable is in the PATH
+    * ``'always'``: no `binary`, the program is always installed
+    * ``'custom'``: the ProgDef overrides :meth:`ProgDef.is_installed`
+      (or inherits from an unknown class), it must be imported to know
+
+Classes:
+    * :class:`Manifest` - Cached manifest of the ProgDefs of a directory
+"""
+
+
+import json
+import logging
+import os
+from collections import namedtuple
+from .common import utils
+logger = logging.getLogger('Systhemer.Progs.manifest')
+
+
+Entry = namedtuple('Entry', ['name', 'module', 'probe', 'binary'])
+Entry.__doc__ = """A ProgDef of the manifest.
+
+:param str name: name of the ProgDef class
+:param str module: name of the module defining it
+:param str probe: installation probe, ``'binary'``, ``'always'`` or
+    ``'custom'``
+:param str binary: executable checked by the ``'binary'`` probe
+"""
+
+
+class Manifest(object):
+    """Manifest of the ProgDefs defined in the modules of a directory."""
+    version = 1
+
+    def __init__(self, path, modules=None):
+        """Build the manifest of the modules in `path`.
+
+        :param str path: directory of the ProgDef modules
+        :param dict modules: cached parse results, as
+            ``{module: {'mtime': mtime, 'class': class_info}}``. Modules
+            whose mtime changed are parsed again.
+        """
+        self.logger = logger
+        self.path = path
+        cached = modules or {}
+        self.modules = {}
+        self.parsed = 0
+
+        for f in sorted(os.listdir(path)):
+            if f[-3:] != '.py' or f == '__init__.py':
+                continue
+            module = f[:-3]
+            mtime = os.stat(os.path.join(path, f)).st_mtime
+            if module in cached and cached[module]['mtime'] == mtime:
+                self.modules[module] = cached[module]
+            else:
+                self.modules[module] = {'mtime': mtime,
+                                        'class': self._parse(module)}
+                self.parsed += 1
+
+        classes = {info['name']: info for info in
+                   (m['class'] for m in self.modules.values()) if info}
+        self.entries = {}
+        for name, info in sorted(classes.items()):
+            probe, binary = self._get_probe(info, classes)
+            self.entries[name] = Entry(name, info['module'], probe, binary)
+
+    def __repr__(self):
+        return self.__class__.__name__ + '(%s, %s ProgDefs)' \
+            % (self.path, len(self.entries))
+
+    def __iter__(self):
+        return iter(self.entries.values())
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __getitem__(self, name):
+        return self.entries[name]
+
+    def _parse(self, module):
+        """Return what the class named after `module` defines, or None."""
+        import ast
+        with open(os.path.join(self.path, module + '.py')) as f:
+            tree = ast.parse(f.read(), module + '.py')
+
+        for node in tree.body:
+            if isinstance(node, ast.ClassDef) and node.name == module:
+                attrs = {}
+                methods = []
+                for item in node.body:
+                    if isinstance(item, ast.Assign) and \
+                       len(item.targets) == 1 and \
+                       isinstance(item.targets[0], ast.Name) and \
+                       isinstance(item.value, ast.Constant):
+                        attrs[item.targets[0].id] = item.value.value
+                    elif isinstance(item, ast.FunctionDef):
+                        methods.append(item.name)
+                bases = [b.id if isinstance(b, ast.Name) else
+                         b.attr if isinstance(b, ast.Attribute) else None
+                         for b in node.bases]
+                return {'name': node.name, 'module': module, 'bases': bases,
+                        'attrs': attrs, 'methods': methods}
+        return None
+
+    def _get_probe(self, info, classes):
+        """Return the (probe, binary) of the class `info`.
+
+        Attributes and methods are looked up in the bases that are
+        ProgDefs of the manifest, up to :class:`ProgDef`.
+        """
+        binary = None
+        found_binary = False
+        while True:
+            if 'is_installed' in info['methods']:
+                return 'custom', None
+            if not found_binary and 'binary' in info['attrs']:
+                binary = info['attrs']['binary']
+                found_binary = True
+            if info['bases'] == ['ProgDef']:
+                break
+            if len(info['bases']) != 1 or info['bases'][0] not in classes:
+                return 'custom', None
+            info = classes[info['bases'][0]]
+
+        return ('binary', binary) if binary else ('always', None)
+
+    def is_installed(self, name):
+        """Return whether the ProgDef `name` is installed.
+
+        Returns None if its probe is ``'custom'``.
+        """
+        entry = self.entries[name]
+        if entry.probe == 'always':
+            return True
+        if entry.probe == 'binary':
+            return utils.which(entry.binary) is not None
+        return None
+
+    @classmethod
+    def get_cache_path(cls):
+        return os.path.join(utils.get_cache_dir(), 'manifest.json')
+
+    @classmethod
+    def load(cls, path):
+        """Return the manifest of `path`, using the cached manifest.
+
+        The cache is updated if any module was parsed.
+        """
+        path = os.path.realpath(path)
+        cache_path = cls.get_cache_path()
+        modules = None
+        try:
+            with open(cache_path) as f:
+                cache = json.load(f)
+            if cache.get('version') == cls.version:
+                modules = cache['dirs'].get(path)
+        except (OSError, ValueError, KeyError):
+            cache = None
+
+        manifest = cls(path, modules)
+        logger.debug('ProgDef manifest loaded, %s module(s) parsed',
+                     manifest.parsed)
+
+        if manifest.parsed or modules is None or \
+           len(modules) != len(manifest.modules):
+            if not cache or cache.get('version') != cls.version:
+                cache = {'version': cls.version, 'dirs': {}}
+            cache['dirs'][path] = manifest.modules
+            try:
+                utils.save_json(cache_path, cache)
+            except OSError as e:
+                logger.warning('Could not save ProgDef manifest: %s', e)
+
+        return manifest
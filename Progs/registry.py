@@ -0,0 +1,125 @@
+"""Index of the value types of the keys of many program definitions.
+
+The theme values are parsed according to the :class:`~Progs.value.Value`
+type of their key. Instead of asking every ProgDef for the type of every
+key, the keys of all the rule trees are indexed once.
+
+Classes:
+    * :class:`KeyType` - Value type and Formatter of a key
+    * :class:`KeyRegistry` - Index of the keys of many ProgDefs
+"""
+
+
+import logging
+from collections import namedtuple
+logger = logging.getLogger('Systhemer.Progs.registry')
+
+
+KeyType = namedtuple('KeyType', ['val_type', 'formatter', 'prog'])
+KeyType.__doc__ = """Value type of a key.
+
+:param val_type: :class:`~Progs.value.Value` subclass of the key
+:param formatter: :class:`~Progs.value.Value.Formatter` of the key's
+    capture group
+:param str prog: name of the ProgDef defining the key
+"""
+
+
+class KeyRegistry(object):
+    """Index of the :class:`KeyType` of every key of many ProgDefs.
+
+    A key defined with different value types by many ProgDefs is a
+    conflict: the type of the last ProgDef added is used, and the others
+    are kept in ``self.conflicts``.
+    """
+    def __init__(self, prog_defs=()):
+        """Build the index of the keys of `prog_defs`.
+
+        :param list prog_defs: :class:`~Progs.template.ProgDef` objects, in
+            order of precedence (the last one wins)
+        """
+        self.logger = logger
+        self.prog_defs = []
+        self.types = {}      # {key: KeyType}
+        self.conflicts = {}  # {key: [KeyType]}, the used type being last
+        self.wildcards = {}  # {wildcard key: KeyType or None}
+
+        for pd in prog_defs:
+            self.add(pd)
+
+    def __repr__(self):
+        return self.__class__.__name__ + '(%s keys, %s conflicts)' \
+            % (len(self.types), len(self.conflicts))
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        return iter(sorted(self.types))
+
+    def add(self, pd):
+        """Add the keys of the ProgDef `pd`.
+
+        The keys it shares with the ProgDefs already added get its types.
+        """
+        self.prog_defs.append(pd)
+        self.wildcards = {}
+        config = pd.get_config()
+        config.get_leaves()
+
+        for key, rules in config.key_index.items():
+            formatter = rules[0].get_key_formatter(key)
+            key_type = KeyType(formatter.get_type(), formatter,
+                               pd.get_name())
+
+            old = self.types.get(key)
+            if old is not None and old.val_type is not key_type.val_type:
+                self.conflicts.setdefault(key, [old]).append(key_type)
+            self.types[key] = key_type
+
+    def get(self, key):
+        """Return the :class:`KeyType` of `key`, or None if unknown.
+
+        Keys can have ``'*'`` parts (see :meth:`RuleTree.expand_key`), in
+        which case the type of the first key they match in the last
+        ProgDef defining any is used.
+        """
+        if key in self.types:
+            return self.types[key]
+        if '*' not in key:
+            return None
+
+        if key not in self.wildcards:
+            self.wildcards[key] = None
+            for pd in reversed(self.prog_defs):
+                keys = pd.get_config().expand_key(key)
+                if keys:
+                    self.wildcards[key] = self.types[keys[0]]
+                    break
+        return self.wildcards[key]
+
+    def expand_key(self, key):
+        """Return the sorted list of the keys of all ProgDefs matching `key`.
+        """
+        return sorted({k for pd in self.prog_defs
+                       for k in pd.get_config().expand_key(key)})
+
+    def parse(self, key, string):
+        """Parse `string` as the value of `key`.
+
+        Returns a :class:`~Progs.value.Litteral` if `key` is unknown.
+        """
+        key_type = self.get(key)
+        if key_type is None:
+            from .value import Litteral
+            return Litteral.Formatter.auto_parse(string)
+        return key_type.val_type.Formatter.auto_parse(string)
+
+    def report_conflicts(self):
+        """Log a warning for every key with conflicting value types."""
+        for key, key_types in sorted(self.conflicts.items()):
+            self.logger.warning(
+                'Key \'%s\' has conflicting value types: %s. Using %s (%s)',
+                key, ', '.join('%s (%s)' % (t.val_type.__name__, t.prog)
+                               for t in key_types),
+                key_types[-1].val_type.__name__, key_types[-1].prog)
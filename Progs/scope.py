@@ -0,0 +1,322 @@
+"""Section scope index.
+
+This module locates every :class:`~Progs.config.Section` of a rule tree
+in a buffer in a single pass, so that rules can get their scope without
+rescanning the buffer for every key.
+
+Classes:
+    * :class:`Block` - A delimited block of the buffer
+    * :class:`Scope` - Scope of a rule: (start, end, depth, excludes)
+    * :class:`ScopeIndex` - Index of all blocks and section headers
+"""
+
+
+import bisect
+import logging
+from collections import namedtuple
+from . import common
+from .common import utils, ExcludeIndex
+from .config import Section
+logger = logging.getLogger('Systhemer.Progs.scope')
+
+
+Scope = namedtuple('Scope', ['start', 'end', 'depth', 'excludes'])
+Scope.__doc__ = """Scope of a rule within a buffer.
+
+:param int start: position right after the opening delimiter
+:param int end: position of the closing delimiter
+:param int depth: nesting depth of the block (0 for the whole buffer)
+:param excludes: :class:`~Progs.common.ExcludeIndex` of the nested
+    blocks, as (depth, startpos, endpos) tuples
+"""
+
+
+class Block(object):
+    """A block of the buffer delimited by a start and an end character.
+
+    ``start`` is the position right after the opening delimiter, ``end``
+    the position of the closing delimiter and ``close`` the position
+    right after it.
+    """
+    def __init__(self, start, depth, parent):
+        self.start = start
+        self.end = None
+        self.close = None
+        self.depth = depth
+        self.parent = parent
+        self.children = []
+
+    def __repr__(self):
+        return self.__class__.__name__ + '(%s, %s, %s)' \
+            % (self.start, self.end, self.depth)
+
+    def get_excludes(self):
+        """Return all nested blocks as (depth, startpos, endpos) tuples.
+
+        Depths are relative to this block.
+        """
+        out = []
+        for child in self.children:
+            out.append((child.depth - self.depth, child.start, child.end))
+            out.extend((d + child.depth - self.depth, s, e)
+                       for d, s, e in child.get_excludes())
+        return out
+
+
+class ScopeIndex(object):
+    """Index of the scopes of every :class:`Section` of a rule tree.
+
+    The buffer is scanned once per pair of delimiters used by the
+    sections of the tree to match every block, and once per section
+    header. Scopes are then found by bisecting the sorted header
+    positions and are memoized per section path.
+
+    A ``^`` in the header of a nested section matches at the start of
+    its parent block, as if the block was the whole buffer: such headers
+    are also matched at the start of the blocks their parents can open.
+
+    Sections are identified by their signature (see
+    :meth:`Section.get_signature`), so sections defined more than once in
+    a tree share their entries.
+    """
+    def __init__(self, _buffer, rules, version=None):
+        """Build the index of `rules` for `_buffer`.
+
+        :param str _buffer: buffer to index
+        :param rules: :class:`~Progs.config.RuleTree` to index
+        :param version: version of the buffer, for the owner of the index
+            to check that it is still up to date
+        """
+        self.logger = logger
+        self.length = len(_buffer)
+        self.version = version
+        # {(signature, match): policy} overriding the match policies of the
+        # sections of the root scope, None selecting no block (the buffer
+        # being a part of a stream, see :mod:`Progs.stream`)
+        self.policies = None
+        self.blocks = {}   # {(startchar, endchar): [Block]}
+        self.headers = {}  # {signature: ([header startpos], [Block])}
+        # {signature: {parent Block: Block}}, headers matched at the start
+        # of their parent block
+        self.anchored = {}
+        self.scopes = {}   # {((signature, match), ...): [Scope]}
+        self.excludes = {}  # {Block: ExcludeIndex}
+
+        sections = self._get_sections(rules)
+        parents = {}  # {signature: {delimiters of the parent sections}}
+        for s, parent in sections:
+            if (s.startchar, s.endchar) not in self.blocks:
+                self._scan_blocks(_buffer, s)
+            delims = parents.setdefault(s.get_signature(), set())
+            if parent is not None:
+                delims.add((parent.startchar, parent.endchar))
+        for s, parent in sections:
+            if s.get_signature() not in self.headers:
+                self._scan_headers(_buffer, s, parents[s.get_signature()])
+
+        self.logger.debug('scope index built: %s blocks, %s section types',
+                          sum(map(len, self.blocks.values())),
+                          len(self.headers))
+
+    def _get_sections(self, section_obj, parent=None):
+        """Return the (section, parent section) of every section of
+        `section_obj`, the parent of root sections being None."""
+        out = []
+        for ro in section_obj:
+            if isinstance(ro, Section):
+                out.append((ro, parent))
+                out.extend(self._get_sections(ro, ro))
+        return out
+
+    def _scan_blocks(self, _buffer, section_obj):
+        """Match every start char with its end char in one pass."""
+        startchar, endchar = section_obj.startchar, section_obj.endchar
+        blocks = []
+        stack = []
+        for m in section_obj.delims_re.finditer(_buffer):
+            if m.group('start') is not None:
+                block = Block(m.end(), len(stack) + 1,
+                              stack[-1] if stack else None)
+                stack.append(block)
+                blocks.append(block)
+            elif stack:
+                block = stack.pop()
+                block.end = m.start()
+                block.close = m.end()
+                if block.parent is not None:
+                    block.parent.children.append(block)
+            else:
+                self.logger.warning('unmatched end char \'%s\' at %s',
+                                    endchar, m.start())
+
+        if stack:
+            self.logger.warning('%s unclosed block(s) for start char'
+                                ' \'%s\'!', len(stack), startchar)
+        self.blocks[(startchar, endchar)] = [b for b in blocks
+                                             if b.end is not None]
+
+    def _scan_headers(self, _buffer, section_obj, parent_delims=()):
+        """Find every header of `section_obj` and its block.
+
+        `parent_delims` are the delimiters of the blocks `section_obj` can
+        be nested in, whose start is also matched against the header.
+        """
+        opened = {b.start: b for b in self.blocks[(section_obj.startchar,
+                                                   section_obj.endchar)]}
+        starts = []
+        blocks = []
+        for m in section_obj.header_re.finditer(_buffer):
+            block = opened.get(m.end())
+            if block is not None:
+                starts.append(m.start())
+                blocks.append(block)
+
+        # '^' only matches at the start of the string, even with `pos`
+        anchored = {}
+        for delims in parent_delims:
+            for parent in self.blocks[delims]:
+                m = section_obj.header_re.match(
+                    _buffer[parent.start:parent.end])
+                block = m and opened.get(parent.start + m.end())
+                if block is not None:
+                    anchored[parent] = block
+
+        self.headers[section_obj.get_signature()] = (starts, blocks)
+        self.anchored[section_obj.get_signature()] = anchored
+
+    def find_blocks(self, section_obj, parent=None):
+        """Yield the blocks of `section_obj` directly in `parent`.
+
+        `parent` is a :class:`Block`, or None for the whole buffer.
+        """
+        starts, blocks = self.headers[section_obj.get_signature()]
+        anchored = None
+        if parent is None:
+            lo, hi = 0, self.length
+        else:
+            lo, hi = parent.start, parent.end
+            anchored = self.anchored[section_obj.get_signature()].get(parent)
+            if anchored is not None:
+                yield anchored
+        excludes = self.get_excludes(parent)
+
+        for i in range(bisect.bisect_left(starts, lo), len(starts)):
+            block = blocks[i]
+            if starts[i] >= hi or block.close > hi:
+                break
+            if block is anchored:
+                continue
+            if excludes.is_excluded((starts[i], block.close)):
+                self.logger.log(common.Settings.VDEBUG,
+                                'section \'%s\' found but in wrong'
+                                ' scope', section_obj.name)
+            else:
+                yield block
+
+    def find_block(self, section_obj, parent=None):
+        """Return the first block of `section_obj` directly in `parent`.
+
+        Returns None if no such block exists.
+        """
+        block = next(self.find_blocks(section_obj, parent), None)
+        if block is None:
+            self.logger.warning('section \'%s\' not found!',
+                                section_obj.name)
+        return block
+
+    def select_blocks(self, section_obj, parent=None):
+        """Return the blocks of `section_obj` in `parent` to use.
+
+        Blocks are selected according to the match policy of `section_obj`.
+        """
+        if parent is None and self.policies is not None:
+            policy = self.policies[(section_obj.get_signature(),
+                                    section_obj.match)]
+            if policy is None:
+                return []
+            return utils.select_matches(list(self.find_blocks(section_obj)),
+                                        policy)
+
+        if section_obj.match == 'first':
+            block = self.find_block(section_obj, parent)
+            return [block] if block is not None else []
+
+        blocks = utils.select_matches(
+            list(self.find_blocks(section_obj, parent)), section_obj.match)
+        if not blocks:
+            self.logger.warning('section \'%s\' not found!',
+                                section_obj.name)
+        return blocks
+
+    def get_excludes(self, block):
+        """Return the :class:`ExcludeIndex` of the blocks nested in `block`.
+
+        The whole buffer (`block` is None) excludes nothing.
+        """
+        if block not in self.excludes:
+            self.excludes[block] = ExcludeIndex(
+                block.get_excludes() if block is not None else ())
+        return self.excludes[block]
+
+    def get_scopes(self, rule_obj):
+        """Return the list of :class:`Scope` of `rule_obj`.
+
+        Each section of the hierarchy tree of `rule_obj` selects its blocks
+        in the blocks of its parent according to its match policy. Rules
+        at the root of the tree get the whole buffer with no excludes.
+        """
+        sections = [ce for ce in rule_obj.get_tree()
+                    if isinstance(ce, Section)]
+        path = tuple((s.get_signature(), s.match) for s in sections)
+
+        if path not in self.scopes:
+            if not sections:
+                scopes = [Scope(0, self.length, 0, self.get_excludes(None))]
+            else:
+                blocks = [None]
+                for s in sections:
+                    blocks = [b for parent in blocks
+                              for b in self.select_blocks(s, parent)]
+                scopes = [Scope(b.start, b.end, b.depth, self.get_excludes(b))
+                          for b in blocks]
+            self.scopes[path] = scopes
+
+        return self.scopes[path]
+
+    def get_scope(self, rule_obj):
+        """Return the first :class:`Scope` of `rule_obj`, or None."""
+        scopes = self.get_scopes(rule_obj)
+        return scopes[0] if scopes else None
+
+    def shift(self, replacements, version=None):
+        """Offset-shift the index after `replacements` were applied.
+
+        :param list replacements: sorted, non-overlapping
+            ``(startpos, endpos, raw_val)`` tuples (or longer tuples, such
+            as :class:`~Progs.config.Edit`)
+        :param version: version of the buffer they produced
+        """
+        ends = []
+        deltas = []
+        delta = 0
+        for start, end, raw_val, *_ in replacements:
+            delta += len(raw_val) - (end - start)
+            ends.append(end)
+            deltas.append(delta)
+
+        def new_pos(pos):
+            i = bisect.bisect_right(ends, pos)
+            return pos + deltas[i-1] if i else pos
+
+        if deltas:
+            for blocks in self.blocks.values():
+                for b in blocks:
+                    b.start, b.end, b.close \
+                        = new_pos(b.start), new_pos(b.end), new_pos(b.close)
+            for starts, _ in self.headers.values():
+                starts[:] = map(new_pos, starts)
+            self.scopes = {}
+            self.excludes = {}
+
+        self.length += delta
+        self.version = version
@@ -0,0 +1,240 @@
+"""Applying values to a configuration read as a stream.
+
+In pipeline mode, the configuration is read from a pipe and written as
+soon as possible, without waiting for the end of the input. The input is
+cut into parts at the ends of lines where every section is closed (and
+the next line doesn't open a block, which could belong to a header
+before the cut), so that every block is in a single part.
+
+Each part is applied like a whole buffer, except for the match policies
+of the root scope: the matches of the rules of the root scope and the
+blocks of its sections are numbered across the parts. A part is written
+once its edits are known, which for a ``'last'`` policy means once a
+later part matches too, or at the end of the input.
+
+Classes:
+    * :class:`Stream` - Configuration applied part by part
+"""
+
+
+import logging
+from .buffer import PieceTable
+from .common import ExcludeIndex
+from .config import Section
+from .scope import ScopeIndex
+logger = logging.getLogger('Systhemer.Progs.stream')
+
+
+def shift_policy(policy, seen, later):
+    """Return the policy selecting in a part what `policy` selects in the
+    whole stream.
+
+    :param policy: match policy, see :meth:`Rule.__init__`
+    :param int seen: number of matches in the previous parts
+    :param bool later: whether the next parts match too
+    """
+    if policy == 'all':
+        return 'all'
+    if policy == 'last':
+        return None if later else 'last'
+    n = 1 if policy == 'first' else policy
+    return n - seen if n > seen else None
+
+
+def get_sections(tree):
+    """Return every :class:`Section` of `tree`."""
+    out = []
+    for ce in tree:
+        if isinstance(ce, Section):
+            out.append(ce)
+            out.extend(get_sections(ce))
+    return out
+
+
+class Part(object):
+    """A part of the stream, the number of matches of the selectors of the
+    root scope in it and its scope index."""
+    def __init__(self, text, index, counts):
+        self.text = text
+        self.index = index
+        self.counts = counts  # {selector: number of matches}
+
+
+class Stream(object):
+    """Values applied by a ProgDef to a configuration read in parts.
+
+    Parts of the configuration are given to :meth:`feed`, the input ending
+    with :meth:`close`, and the output is given to `write` as soon as
+    possible. ProgDefs whose `streamable` attribute is False are applied
+    at the end of the input.
+    """
+    def __init__(self, pd, values, write):
+        """
+        :param pd: :class:`~Progs.template.ProgDef` applying `values`
+        :param dict values: ``{section: {key: value}}`` dictionary
+        :param write: function called with the output
+        """
+        self.logger = logger
+        self.pd = pd
+        self.write = write
+        config = pd.get_config()
+        config.get_leaves()
+
+        # rules of the keys, as in ProgDef.compute_edits
+        self.rules = {}  # {Rule: [(key, value)]}
+        for key, val in pd.get_key_vals(values).items():
+            for rule_obj in pd.find_rules(key, config):
+                self.rules.setdefault(rule_obj, []).append((key, val))
+
+        # selectors of the root scope: rules and sections, by their path
+        # in ScopeIndex.get_scopes
+        self.root_rules = []
+        self.root_sections = {}  # {(signature, match): Section}
+        for rule_obj in self.rules:
+            sections = [ce for ce in rule_obj.get_tree()
+                        if isinstance(ce, Section)]
+            if not sections:
+                self.root_rules.append(rule_obj)
+            else:
+                self.root_sections.setdefault(
+                    (sections[0].get_signature(), sections[0].match),
+                    sections[0])
+        self.seen = dict.fromkeys(self.root_rules, 0)
+        self.seen.update(dict.fromkeys(self.root_sections, 0))
+
+        delims = {}
+        for s in get_sections(config):
+            delims[(s.startchar, s.endchar)] = s.delims_re
+        self.delims = list(delims.values())
+        self.startchars = tuple({start for start, end in delims})
+        self.depths = [0] * len(self.delims)
+
+        self.streamable = pd.streamable
+        self.text = ''
+        self.scan_pos = 0       # start of the first line not scanned
+        self.candidate = None   # end of the last line closing every block
+        self.cut = None
+        self.parts = []         # parts not written yet
+        self.closed = False
+
+    def __repr__(self):
+        return self.__class__.__name__ + '(%s, %s parts pending)' \
+            % (self.pd.get_name(), len(self.parts))
+
+    def feed(self, data):
+        """Add `data` to the input, writing the parts it completes."""
+        self.text += data
+        if not self.streamable:
+            return
+
+        pos = self.scan_pos
+        while True:
+            end = self.text.find('\n', pos) + 1
+            if not end:
+                break
+            self.scan_line(self.text[pos:end], end)
+            pos = end
+        self.scan_pos = pos
+
+        if self.cut:
+            cut = self.cut
+            self.add_part(self.text[:cut])
+            self.text = self.text[cut:]
+            self.scan_pos -= cut
+            if self.candidate is not None:
+                self.candidate -= cut
+            self.cut = None
+
+    def scan_line(self, line, end):
+        """Update the cut position with the line ending at `end`."""
+        stripped = line.strip()
+        if not stripped:
+            return
+        if self.candidate is not None and \
+           not stripped.startswith(self.startchars):
+            self.cut = self.candidate
+        self.candidate = None
+
+        for i, delims_re in enumerate(self.delims):
+            for m in delims_re.finditer(line):
+                if m.group('start') is not None:
+                    self.depths[i] += 1
+                elif self.depths[i]:
+                    self.depths[i] -= 1
+        if not any(self.depths):
+            self.candidate = end
+
+    def close(self):
+        """End the input, writing what is left."""
+        if self.text:
+            self.add_part(self.text)
+            self.text = ''
+        self.closed = True
+        self.flush()
+
+        for rule_obj in self.root_rules:
+            if not self.seen[rule_obj]:
+                for key, value in self.rules[rule_obj]:
+                    self.logger.warning('Found rule \'%s\' in program '
+                                        'definition but not in '
+                                        'configuration file!', key)
+        for (signature, match), section in self.root_sections.items():
+            if not self.seen[(signature, match)]:
+                self.logger.warning('section \'%s\' not found!',
+                                    section.name)
+
+    def add_part(self, text):
+        index = ScopeIndex(text, self.pd.config)
+        counts = {}
+        for rule_obj in self.root_rules:
+            counts[rule_obj] = len(rule_obj.get_matches(
+                text, (0, len(text)), ExcludeIndex(())))
+        for selector, section in self.root_sections.items():
+            counts[selector] = sum(1 for b in index.find_blocks(section))
+        self.parts.append(Part(text, index, counts))
+        self.flush()
+
+    def is_ready(self, i):
+        """Return whether the edits of the part `i` are known."""
+        if self.closed:
+            return True
+        for selector, count in self.parts[i].counts.items():
+            if count and self.get_policy(selector) == 'last' and \
+               not any(p.counts[selector] for p in self.parts[i+1:]):
+                return False
+        return True
+
+    def get_policy(self, selector):
+        if isinstance(selector, tuple):
+            return selector[1]
+        policies = {selector.get_match_policy(k) for k, v
+                    in self.rules[selector]}
+        return 'last' if 'last' in policies else None
+
+    def flush(self):
+        """Write the parts whose edits are known, in order."""
+        while self.parts and self.is_ready(0):
+            part = self.parts.pop(0)
+            later = {s for p in self.parts for s, n in p.counts.items() if n}
+
+            part.index.policies = {
+                s: shift_policy(s[1], self.seen[s], s in later)
+                for s in self.root_sections}
+            edits = []
+            for rule_obj, key_vals in self.rules.items():
+                policies = None
+                if rule_obj in self.seen:
+                    policies = {k: shift_policy(
+                        rule_obj.get_match_policy(k), self.seen[rule_obj],
+                        rule_obj in later) for k, v in key_vals}
+                for scope in part.index.get_scopes(rule_obj):
+                    edits.extend(rule_obj.get_edits(
+                        key_vals, part.text, (scope.start, scope.end),
+                        scope.excludes, policies))
+
+            for selector, count in part.counts.items():
+                self.seen[selector] += count
+
+            buff = PieceTable(part.text)
+            buff.replace_spans(self.pd.resolve_edits(edits))
+            self.write(str(buff))
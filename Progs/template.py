@@ -4,8 +4,10 @@ Every program definition must inherit from the :class:`ProgDef` class
 """
 import logging
 import re
-from .common import utils
-from .config import RuleTree, Section
+from .common import utils, ExcludeIndex
+from .config import RuleTree
+from .scope import ScopeIndex
+from .buffer import PieceTable
 from . import common
 
 
@@ -17,8 +19,29 @@ class ProgDef(object):
     (see already written definitions for example implementation).
 
     If a program definition needs special handling, you may
-    override the :meth:`set` method.
+    override the :meth:`set` and :meth:`apply` methods.
+
+    ProgDefs can be applied in worker processes (see :mod:`Progs.jobs`).
+    Set the `parallel` class attribute to False if the ProgDef must be
+    applied in the main process, e.g. because it changes the Settings.
+
+    Set the `binary` class attribute to the name of the program's
+    executable, so that :meth:`is_installed` can be checked without
+    importing the ProgDef (see :mod:`Progs.manifest`).
+
+    ProgDefs whose files would not change are skipped (see
+    :mod:`Progs.cache`). Set the `cacheable` class attribute to False if
+    applying the ProgDef does more than writing its files.
+
+    In pipeline mode, configurations are applied part by part as they
+    are read (see :mod:`Progs.stream`). Set the `streamable` class
+    attribute to False if a rule of the root scope can match text spanning
+    many lines.
     """
+    parallel = True
+    cacheable = True
+    streamable = True
+    binary = None
 
     def pre_init(self):
         """Pre-init defaults.
@@ -28,7 +51,12 @@ class ProgDef(object):
         self.name = self.__class__.__name__
         self.logger = logging.getLogger('Systhemer.Progs.' + self.name)
         self.filebuff = None
-        self.config = RuleTree()  # add definitions here
+        self.file_hashes = {}
+        self.backup_done = False
+        self._config = None  # built by init when first used
+        self.init_args = ((), {})
+        self.scope_index = None
+        self.conflicts = []
         self.special_excludes = []
         self.presave_hooks = []
         self.postsave_hooks = []
@@ -43,7 +71,48 @@ class ProgDef(object):
         if utils.get_setting('make_backup'):
             self.presave_hooks.append(self.mk_backup)
 
-        self.init(*args, **kwargs)
+        self.init_args = (args, kwargs)
+
+    @property
+    def config(self):
+        """The rule tree, built by :meth:`init` when first used."""
+        if self._config is None:
+            self._config = RuleTree()
+            args, kwargs = self.init_args
+            self.init(*args, **kwargs)
+        return self._config
+
+    @config.setter
+    def config(self, rules):
+        self._config = rules
+
+    def __getstate__(self):
+        """Return the state to pickle, to send the ProgDef to a worker.
+
+        The rule tree and the buffers are left out; the rule tree is
+        rebuilt by :meth:`init` when first used. Hooks that are methods of
+        the ProgDef are saved by name.
+        """
+        state = self.__dict__.copy()
+        for k in ('logger', '_config', 'filebuff', 'file_hash',
+                  'file_hashes', 'scope_index'):
+            state.pop(k, None)
+        for hooks in ('presave_hooks', 'postsave_hooks'):
+            state[hooks] = [h.__name__ if getattr(h, '__self__', None)
+                            is self else h for h in state[hooks]]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = logging.getLogger('Systhemer.Progs.' + self.name)
+        self.filebuff = None
+        self.file_hash = None
+        self.file_hashes = {}
+        self.scope_index = None
+        for hooks in ('presave_hooks', 'postsave_hooks'):
+            setattr(self, hooks, [getattr(self, h) if type(h) is str else h
+                                  for h in state[hooks]])
+        self._config = None
 
     def init(self, *args, **kwargs):
         """Define rules for configuration.
@@ -59,11 +128,12 @@ class ProgDef(object):
     def is_installed(self):
         """Check if the program is installed on the target system.
 
-        Returns a boolean.
+        Returns a boolean. By default, checks that the `binary` executable
+        is in the PATH; ProgDefs with no `binary` are always installed.
 
-        This method must be overridden.
+        Can be overridden if necessary
         """
-        raise NotImplementedError()
+        return self.binary is None or utils.which(self.binary) is not None
 
     def get_default_path(self):
         """Return the path to use for configuration.
@@ -88,6 +158,7 @@ class ProgDef(object):
 
     def get_key_type(self, key):
         try:
+            key = self.config.expand_key(key)[0]
             return self.find_rules(key, self.config)[0].get_key_type(key)
         except IndexError:
             pass
@@ -105,191 +176,292 @@ class ProgDef(object):
                                       msg=msg, critical=True)
         return file_path
 
-    def get_file_buffer(self):
-        """Check if filebuffer exists. If not, one is created."""
+    def get_out_file_path(self):
+        """Return the path the file is saved to. The file path by default.
+
+        Can be overridden if necessary
+        """
+        return self.get_file_path()
+
+    def get_file_hash(self, file_path):
+        """Return the hash of the contents of `file_path`.
+
+        Returns None if the file doesn't exist. Hashes are cached, the
+        loaded file using the hash of its filebuffer.
+        """
+        import os
+
+        file_path = os.path.realpath(file_path)
+        if self.filebuff is not None and \
+           file_path == os.path.realpath(self.get_file_path()):
+            return self.file_hash
+        if file_path not in self.file_hashes:
+            try:
+                with open(file_path) as f:
+                    self.file_hashes[file_path] = utils.hash_text(f.read())
+            except FileNotFoundError:
+                self.file_hashes[file_path] = None
+        return self.file_hashes[file_path]
+
+    def get_file_stats(self):
+        """Return what identifies the versions of the input and output
+        files, to notice files changed by others (e.g. in watch mode)."""
+        import os
+        stats = []
+        for file_path in (self.get_file_path(), self.get_out_file_path()):
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                stats.append(None)
+            else:
+                stats.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        return tuple(stats)
+
+    def unload(self):
+        """Forget the filebuffer and the file hashes, so that the files
+        are read again by the next :meth:`apply`."""
+        self.filebuff = None
+        self.file_hash = None
+        self.file_hashes = {}
+        self.scope_index = None
+
+    def load_file_buffer(self):
+        """Check if filebuffer exists. If not, one is created.
+
+        Returns the :class:`~Progs.buffer.PieceTable` of the file.
+        """
         # if filebuffer doesn't exist
         if self.filebuff is None:
             # get file path from Settings if file is not foudn in default path
             file_path = self.get_file_path()
 
             with open(file_path) as configfile:
-                self.filebuff = configfile.read()
+                content = configfile.read()
+                self.filebuff = PieceTable(content)
+                self.file_hash = utils.hash_text(content)
                 self.logger.debug('Created filebuffer from %s', file_path)
         return self.filebuff
 
+    def get_file_buffer(self):
+        """Return the contents of the filebuffer as a `str`.
+
+        The filebuffer is created if it doesn't exist.
+        """
+        return str(self.load_file_buffer())
+
     def find_rules(self, key, rules):
         """Return an array of rule objects that contain `key`.
         """
-        return [l for l in rules.get_leaves() if key in l.keys]
-
-    def narrow_buffer(self, section_obj, initial_buffer,
-                      recur=False, recpos=0, recdepth=0, excludes=None):
-        """Return a tuple for the start and end of the scope.
+        return rules.find_rules(key)
 
-        Returns a tuple the start and end positions of the scope
-        within the initial_buffer: (startpos, endpos).
+    def get_scope_index(self, _buffer):
+        """Return the scope index of the filebuffer, building it if needed.
 
-        Exclude rule format: (depth, startpos, endpos).
+        `_buffer` must be the current contents of the filebuffer. The index
+        is rebuilt whenever the filebuffer was edited without shifting it.
         """
-        excludes = [] if excludes is None else excludes
-
-        # main function
-        if not recur:
-            count = 0
-            for start_char in re.finditer(section_obj.name
-                                          + section_obj.separator
-                                          + section_obj.startchar,
-                                          initial_buffer):
-                self.logger.log(common.Settings.VDEBUG,
-                                'found start char for name: \'%s\'',
-                                section_obj.name)
-                start_pos = start_char.end()
-                (end_pos, exclusions) = self.narrow_buffer(
-                    section_obj, initial_buffer, recur=True,
-                    recpos=start_pos)
-                end_char = re.search(section_obj.endchar,
-                                     initial_buffer[end_pos:])
-                # continue_parent = False
-                for e in excludes:
-                    # print(e, (start_char.start(), end_pos+end_char.end()))
-                    if utils.is_excluded(e, (start_char.start(),
-                                             end_pos+end_char.end())):
-                        self.logger.error('section \'%s\' found but'
-                                          ' in wrong scope!'
-                                          ' returning None)',
-                                          section_obj.name)
-                        count += 1
-                        break
-
-                # if loop executes with no `break`
-                else:
-                    return (start_pos, end_pos, exclusions)
-
-            # if falls through...
-            self.logger.warning('section \'%s\' not found!'
-                                ' (returning None)', section_obj.name)
-            return None
-
-        # this recursive portion gets the position of the ending delimiter
-        # NOTE: the recursion here could technically be replaced with a loop
-        # DONE: it is no longer unnecessarily recursive!
-        else:
-            depth = 0
-            for end_or_start_char in re.finditer('(%s|%s)' %
-                                                 (section_obj.startchar,
-                                                  section_obj.endchar),
-                                                 initial_buffer[recpos:]):
-                is_startchar = re.search(section_obj.startchar,
-                                         initial_buffer[recpos:]
-                                         [end_or_start_char.start():
-                                          end_or_start_char.end()])
-                # if it's a start character
-                if is_startchar is not None:
-                    depth += 1
-                    self.logger.log(common.Settings.VDEBUG, 'found start char')
-                    # append a new exclude with None as end position
-                    excludes.append((depth,
-                                     recpos + end_or_start_char.end(),
-                                     None))
-
-                # if it's an end character
-                else:
-                    self.logger.log(common.Settings.VDEBUG, 'found end char')
-                    if depth == 0:
-                        return (recpos+end_or_start_char.start(), excludes)
-                    # find the first exclude tuple that has the same depth as
-                    # the current depth and a value of None for the end
-                    # position and set the end position for that exclude tuple
-                    for i in range(len(excludes)):
-                        if excludes[i][0] == depth and \
-                           excludes[i][2] is None:
-                            excludes[i] = (excludes[i][0],
-                                           excludes[i][1],
-                                           recpos + end_or_start_char.start())
-                            break
-                    depth -= 1
+        version = self.filebuff.version
+        if self.scope_index is None or self.scope_index.version != version:
+            self.scope_index = ScopeIndex(_buffer, self.config, version)
+        return self.scope_index
 
     def get_proper_buffer(self, initial_buffer, rule_obj):
-        """Return rule_objs scope portion of initial_buffer."""
-
-        # hierarchy tree for rule_obj
-        scope_tree = rule_obj.get_tree()
-
-        scope_tree.pop(0)
-        out_buffer = initial_buffer
-        exclude_ranges = []
-        start = 0
-        start_offset = 0
-        is_in_root = True
-
-        for ce in scope_tree:
-            if isinstance(ce, Section):
-                is_in_root = False
-
-                for er in range(len(exclude_ranges)):
-                    exclude_ranges[er] \
-                        = (exclude_ranges[er][0],
-                           exclude_ranges[er][1]-start,
-                           exclude_ranges[er][2]-start)
-
-                buffer_exists = self.narrow_buffer(ce, out_buffer,
-                                                   excludes=exclude_ranges)
-                if buffer_exists:
-                    start, end, exclude_ranges = buffer_exists
-                else:
-                    return None
+        """Return rule_objs scope portion of initial_buffer.
 
-                out_buffer = out_buffer[start:end]
-                start_offset += start
+        Returns a tuple of the (startpos, endpos) of the scope and of the
+        list of its excluded ranges, or None if the scope is not found.
+        """
+        scope = self.get_scope_index(initial_buffer).get_scope(rule_obj)
+        if scope is None:
+            return None
 
-        # print(exclude_ranges)
+        return (scope.start, scope.end), scope.excludes
 
-        if is_in_root:
-            return (0, len(initial_buffer)), exclude_ranges
+    def get_proper_buffers(self, initial_buffer, rule_obj):
+        """Return all of rule_objs scopes in initial_buffer.
 
-        return (start_offset, (end-start)+start_offset), exclude_ranges
+        Returns a list of tuples like :meth:`get_proper_buffer`, one for
+        each of the sections selected by the match policies of the
+        sections of rule_obj.
+        """
+        return [((scope.start, scope.end), scope.excludes) for scope
+                in self.get_scope_index(initial_buffer).get_scopes(rule_obj)]
 
-    def _set(self, rule_obj, key, value, _buffer):
-        """Set a `value` to `key` according to `rule_obj`.
+    def set(self, key, value, section):
+        """Set `value` to `key`.
 
-        Internal function.
+        Can be overridden if there are specific needs.
         """
+        self.apply({section: {key: value}})
 
-        section_exists = self.get_proper_buffer(_buffer, rule_obj)
-        if section_exists:
-            scope_range, exclude_ranges = section_exists
-        else:
-            return None
+    def apply(self, values):
+        """Apply every key of `values` in a single pass.
 
-        return rule_obj._set(key, value, _buffer, scope_range, exclude_ranges)
+        `values` is a ``{section: {key: value}}`` dictionary. The rule tree
+        is walked once: each rule is scoped and matched a single time for
+        all of its keys and emits its :class:`~Progs.config.Edit` records
+        against a snapshot of the filebuffer. The edits are then checked
+        for conflicts and applied to the filebuffer in one sorted sweep.
 
-    def set(self, key, value, section):
-        """Set `value` to `key`.
+        The snapshot is the filebuffer joined into a `str`, once per apply
+        rather than once per key: the rule regexes only match a `str`.
 
         Can be overridden if there are specific needs.
         """
-        # Check if filebuffer exists. If not, create one
-        self.get_file_buffer()
-
-        # get array of rules that contain 'key'
-        rules = self.find_rules(key, self.config)
-        if rules:
-            self.logger.debug('Key: \'%s\' Found! (found %s times)',
-                              key, len(rules))
-        else:
-            self.logger.debug('Key: \'%s\' Not found', key)
+        filebuff = self.load_file_buffer()
+        # edits are computed against an immutable snapshot
+        _buffer = str(filebuff)
+        rgx_misses = utils.rgx_stats['misses']
+
+        edits = self.compute_edits(self.get_key_vals(values), _buffer)
+        edits = self.resolve_edits(edits)
+        filebuff.replace_spans(edits)
+        if self.scope_index is not None:  # None if no rule was scoped
+            self.scope_index.shift(edits, filebuff.version)
+
+        self.logger.debug('regex cache: %s hits, %s misses'
+                          ' (%s compiled while applying)',
+                          utils.rgx_stats['hits'], utils.rgx_stats['misses'],
+                          utils.rgx_stats['misses'] - rgx_misses)
+        self.logger.debug('exclude index: %s queries, %s comparisons'
+                          ' (%s avoided)', ExcludeIndex.stats['queries'],
+                          ExcludeIndex.stats['comparisons'],
+                          ExcludeIndex.stats['avoided'])
+
+    def diff_values(self, old, new):
+        """Return the values of `new` to apply where `old` was applied.
+
+        `old` and `new` are ``{section: {key: value}}`` dictionaries. They
+        are compared once flattened by :meth:`get_key_vals`, so that
+        section and wildcard precedence are those of a whole apply of
+        `new`, and expressions are compared by their values. The keys of
+        the rules whose value changed are returned in a single section,
+        the dictionary being empty if there are none.
+
+        Can be overridden by ProgDefs not applying values through rules.
+        """
+        old_key_vals = self.get_key_vals(old)
+        changed = {}
+        for key, val in self.get_key_vals(new).items():
+            if not self.find_rules(key, self.config):
+                continue
+            old_val = old_key_vals.pop(key, None)
+            if old_val is None or old_val.evaluate() != val.evaluate():
+                changed[key] = val
+
+        removed = [key for key in old_key_vals
+                   if self.find_rules(key, self.config)]
+        if removed:
+            self.logger.info('Keys removed from the theme keep their '
+                             'value: %s', ', '.join(sorted(removed)))
+        return {'theme': changed} if changed else {}
+
+    def get_key_vals(self, values):
+        """Flatten `values` into a ``{key: value}`` dictionary.
+
+        When a key is set in more than one section, the last one wins, as
+        it would with consecutive calls to :meth:`set`. Keys may contain
+        wildcards (see :meth:`RuleTree.expand_key`), keys set explicitly
+        taking precedence over the ones expanded from wildcards.
+        """
+        key_vals = {}
+        wild_key_vals = {}
+        for section in values.values():
+            for key, val in section.items():
+                if '*' in key:
+                    for k in self.config.expand_key(key):
+                        wild_key_vals[k] = val
+                else:
+                    key_vals[key] = val
+        wild_key_vals.update(key_vals)
+        return wild_key_vals
+
+    def compute_edits(self, key_vals, _buffer, index=None):
+        """Return the list of edits setting `key_vals` in `_buffer`.
 
-        # go through rules applying 'value' for 'key'
-        for rule_obj in rules:
-            self.filebuff = self._set(rule_obj, key, value, self.filebuff)
+        `_buffer` must be the current contents of the filebuffer, unless
+        `index` is the :class:`~Progs.scope.ScopeIndex` of `_buffer`. It is
+        only read, so the edits of each rule are independent of the others.
+        """
+        # group keys by rule
+        rules = {}
+        for key, val in key_vals.items():
+            rule_objs = self.find_rules(key, self.config)
+            if not rule_objs:
+                self.logger.debug('Key: \'%s\' Not found', key)
+            for rule_obj in rule_objs:
+                rules.setdefault(rule_obj, []).append((key, val))
+
+        edits = []
+        for rule_obj, rule_key_vals in rules.items():
+            if index is None:
+                scopes = self.get_proper_buffers(_buffer, rule_obj)
+            else:
+                scopes = [((scope.start, scope.end), scope.excludes)
+                          for scope in index.get_scopes(rule_obj)]
+            for scope_range, exclude_ranges in scopes:
+                edits.extend(rule_obj.get_edits(rule_key_vals, _buffer,
+                                                scope_range, exclude_ranges))
+        return edits
+
+    def render(self, values, _buffer, index=None):
+        """Return `_buffer` with `values` applied, as :meth:`apply` would.
+
+        The filebuffer is left untouched, so that many themes can be
+        rendered from the same configuration. `index` is the
+        :class:`~Progs.scope.ScopeIndex` of `_buffer`, built if not given;
+        it is only read, and can be shared by the renders of `_buffer`.
+        """
+        if index is None:
+            index = ScopeIndex(_buffer, self.config)
+        edits = self.compute_edits(self.get_key_vals(values), _buffer, index)
+        buff = PieceTable(_buffer)
+        buff.replace_spans(self.resolve_edits(edits))
+        return str(buff)
+
+    def resolve_edits(self, edits):
+        """Return the sorted list of non-conflicting edits.
+
+        * Identical edits (e.g. from a section defined twice) are kept once.
+        * Edits of the same span with different texts conflict: the last
+          one in `edits` wins.
+        * Edits overlapping a previous one conflict and are dropped.
+
+        Conflicts are logged and kept in ``self.conflicts`` as
+        ``(kept_edit, dropped_edit)`` tuples.
+        """
+        self.conflicts = []
+        out = []
+        # sort is stable: same spans stay in the order they were emitted
+        for e in sorted(edits, key=lambda e: (e.start, e.end)):
+            if out and (e.start, e.end) == (out[-1].start, out[-1].end):
+                if e.text == out[-1].text:
+                    self.logger.log(common.Settings.VDEBUG,
+                                    'duplicate edit for \'%s\' by %s',
+                                    e.key, e.rule)
+                    continue
+                self.logger.warning('Keys \'%s\' and \'%s\' set the same'
+                                    ' field to different values!'
+                                    ' Using \'%s\'.',
+                                    out[-1].key, e.key, e.key)
+                self.conflicts.append((e, out[-1]))
+                out[-1] = e
+            elif out and e.start < out[-1].end:
+                self.logger.warning('Edit of key \'%s\' at %s overlaps the'
+                                    ' one of key \'%s\'! Ignoring it.',
+                                    e.key, (e.start, e.end), out[-1].key)
+                self.conflicts.append((out[-1], e))
+            else:
+                out.append(e)
+        return out
 
     def gen_diff(self):
         """Generate and print a diff of the change in config file."""
 
         file_path = self.get_file_path()
 
-        with open(file_path) as fbefore:
-            before = fbefore.read()
+        # the filebuffer keeps the text it was loaded with
+        before = self.load_file_buffer().original
         after = self.get_file_buffer()
         import difflib
 
@@ -299,7 +471,7 @@ class ProgDef(object):
         ffile = file_path
         tfile = file_path
 
-        if not utils.get_setting('no_colorlog'):
+        if utils.colors_enabled():
             esc = '\x1b[{}m'
             red, green, cyan, none = 31, 32, 36, 0
             reset = esc.format(0)
@@ -347,7 +519,13 @@ class ProgDef(object):
                 prev_line = l
 
     def mk_backup(self):
-        """Save the old contents to a backup file"""
+        """Save the old contents to a backup file.
+
+        The backup is only written once, e.g. when it was already written
+        while prefetching (see :mod:`Progs.aio`).
+        """
+        if self.backup_done:
+            return
         self.logger.info('Writing backup file for program: `%s`...',
                          self.get_name())
 
@@ -355,26 +533,103 @@ class ProgDef(object):
 
         import shutil
         shutil.copy(file_path, file_path+'.bak', follow_symlinks=True)
+        self.backup_done = True
 
     def do_save(self):
         """Save the file and run pre/post-save hooks."""
 
         # Pre-save
-        self.logger.debug('Running pre-save hooks...')
-        [h() for h in self.presave_hooks]
+        self.pre_save()
 
         # save
+        if utils.get_setting('no_save'):
+            return
         self.logger.debug('Saving to config file...')
-        if not utils.get_setting('no_save'):
-            self.save()
+        changed = self.save()
 
         # Post-save
+        self.post_save(changed)
+
+    def pre_save(self):
+        """Run the pre-save hooks."""
+        self.logger.debug('Running pre-save hooks...')
+        [h() for h in self.presave_hooks]
+
+    def post_save(self, changed):
+        """Run the post-save hooks, unless `changed` is False."""
+        if changed is False:
+            self.logger.debug('File unchanged, skipping post-save hooks')
+            return
         self.logger.debug('Running post-save hooks...')
         [h() for h in self.postsave_hooks]
 
     def save(self):
         """Save the file.
 
+        Should return whether the file changed, e.g. by saving through
+        :meth:`write_file`. Post-save hooks are skipped if it returns
+        False.
+
         This method must be overridden.
         """
         raise NotImplementedError()
+
+    def write_file(self, file_path, content=None):
+        """Write `content` (the filebuffer by default) to `file_path`.
+
+        Nothing is written if the file already holds the same content,
+        which is checked against its hash (see :meth:`get_file_hash`).
+        Otherwise, the content is written to a temporary file next to the
+        target, which then atomically replaces it: the target is never
+        left half-written. Symbolic links are followed.
+
+        With the `fsync` setting, the file is synced before replacing the
+        target and its directory is synced by :meth:`utils.fsync_dirs`.
+
+        Returns whether the file was written.
+        """
+        import os
+        import tempfile
+
+        if content is None:
+            content = self.get_file_buffer()
+        file_path = os.path.realpath(file_path)
+
+        # check for changes
+        new_hash = utils.hash_text(content)
+        if new_hash == self.get_file_hash(file_path):
+            self.logger.info('%s is unchanged, not saving', file_path)
+            return False
+
+        # atomic write
+        self.logger.info('Saving to %s...', file_path)
+        dir_path, file_name = os.path.split(file_path)
+        fsync = getattr(common.Settings, 'fsync', False)
+        fd, tmp_path = tempfile.mkstemp(prefix='.' + file_name + '.',
+                                        suffix='.tmp', dir=dir_path)
+        try:
+            with os.fdopen(fd, 'w') as tmpfile:
+                tmpfile.write(content)
+                tmpfile.flush()
+                if fsync:
+                    os.fsync(tmpfile.fileno())
+            if os.path.exists(file_path):
+                import shutil
+                shutil.copymode(file_path, tmp_path)
+            else:
+                # mkstemp creates the file with mode 0600
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(tmp_path, 0o666 & ~umask)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        if fsync:
+            utils.fsync_pending_dirs.add(dir_path)
+        if file_path == os.path.realpath(self.get_file_path()):
+            self.file_hash = new_hash
+        else:
+            self.file_hashes[file_path] = new_hash
+        return True
@@ -7,6 +7,7 @@ subclass of Value defines a certain configuration value to be parsed.
 e.g. Color, Keybind, etc.
 """
 
+import functools
 import itertools
 # from enum import Enum
 # from . import common
@@ -45,18 +46,102 @@ class PipelineableObject(object):
             self.non_existant('parse')
 
 
+PARSE_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_cached(val_type, string):
+    return val_type.Formatter.auto_parse_uncached(string)
+
+
+def memoize_auto_parse(parse):
+    """Return `parse`, an ``auto_parse`` function, behind the parse cache.
+
+    Values parsed from the same string by the same Value type are shared,
+    which is why only immutable values are memoized. Pipelined parses are
+    not cached.
+    """
+    @functools.wraps(parse)
+    def auto_parse(s, pipeline=False):
+        if pipeline:
+            return parse(s, pipeline=True)
+        return _parse_cached(auto_parse.get_type(), s)
+    return auto_parse
+
+
+def parse_cache_info():
+    """Return the (hits, misses, maxsize, currsize) of the parse cache."""
+    return _parse_cached.cache_info()
+
+
+def clear_parse_cache():
+    _parse_cached.cache_clear()
+
+
 class Value(object):
+    __slots__ = ()
+
     class Formats:
         """Implementation not necessary but makes code more readable"""
         pass
 
     class Formatter(object):
+        # Formatters are interned: creating a Formatter with the same
+        # arguments returns the same object, so `__init__` must return
+        # right away if `self.initialized` is True, and set it once done
+        instances = {}  # {(class, args, kwargs): Formatter}
+        initialized = False
+        # `auto_parse` of the subclasses is memoized (the original being
+        # kept as `auto_parse_uncached`), unless their values are mutable
+        memoize = True
+
+        def __init_subclass__(cls, **kwargs):
+            super().__init_subclass__(**kwargs)
+            if cls.memoize and 'auto_parse' in cls.__dict__:
+                parse = cls.__dict__['auto_parse'].__func__
+                cls.auto_parse_uncached = staticmethod(parse)
+                auto_parse = memoize_auto_parse(parse)
+                auto_parse.get_type = cls.get_type
+                cls.auto_parse = staticmethod(auto_parse)
+
         @staticmethod
         def get_type():
             """Must be implemented"""
             raise NotImplementedError()
 
+        def __new__(cls, *args, **kwargs):
+            key = (cls, args, tuple(sorted(kwargs.items()))) if kwargs \
+                else (cls, args)
+            formatter = Value.Formatter.instances.get(key)
+            if formatter is None:
+                # the arguments are bound to the parameters of `__init__`,
+                # defaults included, so that e.g. ``Formatter(fmat)`` and
+                # ``Formatter(fmat, sep=' ')`` are the same formatter
+                import inspect
+                bound = inspect.signature(cls.__init__).bind(
+                    None, *args, **kwargs)
+                bound.apply_defaults()
+                args, kwargs = bound.args[1:], bound.kwargs
+                bound_key = (cls, args, tuple(sorted(kwargs.items())))
+                formatter = Value.Formatter.instances.get(bound_key)
+                if formatter is None:
+                    formatter = super().__new__(cls)
+                    formatter.init_args = args
+                    formatter.init_kwargs = kwargs
+                    Value.Formatter.instances[bound_key] = formatter
+                Value.Formatter.instances[key] = formatter
+            return formatter
+
+        def __reduce__(self):
+            if self.init_kwargs:  # keyword-only parameters
+                return (functools.partial(self.__class__,
+                                          **self.init_kwargs),
+                        self.init_args)
+            return (self.__class__, self.init_args)
+
         def __init__(self, fmat):
+            if self.initialized:
+                return
             # For now, (until i can figure it out,) it displays logger class
             # as Systhemer.value.Value.Formatter instead of actual
             # instance parent class name :(
@@ -114,6 +199,11 @@ class Value(object):
         """Must be implemented"""
         raise NotImplementedError()
 
+    def evaluate(self):
+        """Return the value to format, see :class:`~Progs.expr.Expression`.
+        """
+        return self
+
 
 class Color(Value):
     """Value subclass for colors.
@@ -121,12 +211,17 @@ class Color(Value):
     Stores red, green, blue and alpha channels in separate attributes.
     Range from 0 - 1 each. By default, they are 0, 0, 0 and 1
     respectively.
+
+    Colors are immutable and interned: creating a color with the same
+    channels as a recent one returns that object, so themes repeating
+    colors share them (see :meth:`intern`).
     """
 
-    R = 0
-    G = 0
-    B = 0
-    A = 1
+    __slots__ = ('R', 'G', 'B', 'A', '_hash')
+    channels = ('R', 'G', 'B', 'A')
+    logger = logging.getLogger('Systhemer.value.ColorFormat')
+    instances = {}  # {(R, G, B, A): Color}
+    instances_size = 65536
 
     class formats:
         """Enum of supported color formats."""
@@ -147,7 +242,10 @@ class Color(Value):
         bases = {'x': 16, 'X': 16, 'd': 10, 'f': 10}
         max_digits = 2
 
-        def __init__(self, *args, **kwargs):
+        def __init__(self, *args):
+            if self.initialized:
+                return
+
             def float_gen(value):
                 out = {}
                 for val in 'RGBA':
@@ -162,13 +260,107 @@ class Color(Value):
                 if bchar == 'f':
                     return lambda v: float(v)
 
-            super(self.__class__, self).__init__(*args, **kwargs)
+            super(self.__class__, self).__init__(*args)
             self.extra_val_gens = [float_gen]
             self.extra_val_subs = [float_sub]
             self.extra_val_convs = [float_conv]
+            self.format_cache = {}  # {Color: formatted string}
+            self.compile()
+            self.compile_format()
+            self.initialized = True
+
+        format_cache_size = 4096
 
         def format(self, value, pipeline=False):
-            """Return color according to color_format."""
+            """Return color according to color_format.
+
+            Results are memoized per color, see :meth:`compile_format`.
+            """
+            out_str = self.format_cache.get(value)
+            if out_str is None:
+                if len(self.format_cache) >= self.format_cache_size:
+                    self.format_cache.clear()
+                out_str = self.format_cache[value] = self.format_fn(value)
+
+            if pipeline:
+                return PipelineableObject(self, out_str)
+            return out_str
+
+        def compile_format(self):
+            """Generate ``self.format_fn``, formatting a color to the format.
+
+            The format is analysed once, and the generated function only
+            computes the fields it uses: standard fields (e.g. ``xRR``) are
+            looked up in a table of the formatted strings of every channel
+            value, other fields come from ``self.extra_val_gens``. Formats
+            with conversions or field attributes fall back to computing
+            every field (see :meth:`get_fields`).
+
+            ``self.layout`` is set to the parts of the format, literal
+            strings and ``(channel, bchar, num_digits, table)`` tuples for
+            standard fields, or to None if the format has other fields.
+            """
+            import string
+
+            def fallback(value):
+                return self.fmat.format(**self.get_fields(value))
+
+            namespace = {'extra_val_gens': self.extra_val_gens}
+            parts = []
+            layout = []
+            uses_extras = False
+            for literal, field, spec, conversion \
+                    in string.Formatter().parse(self.fmat):
+                if literal:
+                    parts.append(repr(literal))
+                    if layout is not None:
+                        layout.append(literal)
+                if field is None:
+                    continue
+                if conversion or not field.isidentifier() or '{' in spec:
+                    self.format_fn = fallback
+                    self.layout = None
+                    return
+
+                bchar, val = field[0], field[1:2]
+                num_digits = len(field) - 1
+                if bchar in self.bases and val and val in 'RGBA' and \
+                   field[1:] == val * num_digits and \
+                   num_digits <= self.max_digits:
+                    # table of the formatted strings of every value
+                    base = self.bases[bchar]
+                    table = 'table%s' % len(namespace)
+                    namespace[table] = [
+                        ('{:0>%s%s}' % (num_digits, bchar)).format(i)
+                        for i in range(base**num_digits)]
+                    expr = '%s[round(value.%s * %s)]' \
+                        % (table, val, (base**num_digits)-1)
+                    if spec:
+                        expr = 'format(%s, %r)' % (expr, spec)
+                        layout = None
+                    elif layout is not None:
+                        layout.append((val, bchar, num_digits,
+                                       namespace[table]))
+                else:
+                    expr = 'format(extra[%r], %r)' % (field, spec)
+                    uses_extras = True
+                    layout = None
+
+                parts.append(expr)
+
+            src = 'def format_fn(value):\n'
+            if uses_extras:
+                src += '    extra = {}\n' \
+                       '    for func in extra_val_gens:\n' \
+                       '        extra.update(func(value))\n'
+            src += '    return \'\'.join((%s))\n' % ''.join(p + ', '
+                                                          for p in parts)
+            exec(src, namespace)
+            self.format_fn = namespace['format_fn']
+            self.layout = layout
+
+        def get_fields(self, value):
+            """Return the dict of every field of `value` for the format."""
 
             # return max value possible for number of `base`
             # and of `length` digits
@@ -197,20 +389,18 @@ class Color(Value):
             for func in self.extra_val_gens:
                 values.update(func(value))
 
-            # print(values)
+            return values
 
-            # apply format with pre-formatted values
-            out_str = self.fmat.format(**values)
-
-            if pipeline:
-                return PipelineableObject(self, out_str)
-            return out_str
+        def compile(self):
+            """Compile the parse regex and the converters of the format.
 
-        def parse(self, string, pipeline=False):
-            """Parse `string` with format and extract rgba values"""
-
-            def convert(string, base):
-                return int(string, base)/((base**len(string))-1)
+            ``self.converters`` holds a ``(key, index, base, maxval,
+            convert)`` tuple for each RGBA group of ``self.parse_re``,
+            `index` being the position of the channel in
+            :attr:`Color.channels`: the value of the group is
+            ``int(string, base)/maxval``, or ``convert(string)`` if
+            `convert` is not None (e.g. for floats).
+            """
 
             def subfn(m):
                 _fmat = m.group(1)
@@ -219,6 +409,7 @@ class Color(Value):
                 key = _fmat[1]
                 keys_types[key] = key_type
                 digits = len(_fmat[1:])
+                keys_digits[key] = digits
 
                 for func in self.extra_val_subs:
                     o = func(m)
@@ -227,16 +418,16 @@ class Color(Value):
 
                 return '(?P<%s>%s)' % (key, (r'.'*digits))
 
-            # dict of shorthands for getting values of different bases
-            conversions = {}
-            for bchar, base in self.bases.items():
+            # shorthands for getting values of different bases
+            # and number of digits
+            def get_converter(key, bchar, digits):
+                index = Color.channels.index(key)
                 for func in self.extra_val_convs:
                     conv = func(bchar)
                     if conv is not None:
-                        conversions[bchar] = conv
-                        break
-                else:
-                    conversions[bchar] = lambda v, b=base: convert(v, b)
+                        return (key, index, None, None, conv)
+                base = self.bases[bchar]
+                return (key, index, base, (base**digits)-1, None)
 
             # escape fmat and unescape '{' '}' chars afterwards
             fmat = re.escape(self.fmat)
@@ -248,25 +439,37 @@ class Color(Value):
             # and passing the match objs to subfn
             # NOTE: subfn side effect: modifies keys_types
             keys_types = {}
+            keys_digits = {}
             color_format_re = re.sub(r'\{((?:[^}]|\\\})*)\}', subfn, fmat)
-            # print(self.fmat, color_format_re)
-
-            # extract values from `color` string using generated regexpr
-            match = re.search(color_format_re, string)
-            self.logger.log(utils.get_setting('VDEBUG'), match.groupdict())
 
-            # construct out_obj Color object
-            out_obj = Color()
+            self.parse_re = re.compile(color_format_re)
+            self.converters = [
+                get_converter(k, keys_types[k], keys_digits[k])
+                for k in self.parse_re.groupindex if k in 'RGBA']
 
-            for k, value in match.groupdict().items():
-                if k in 'RGBA':
-                    k_type = keys_types[k]
-
-                    convert_fun = conversions[k_type]
-                    attr_val = convert_fun(value)
+        def parse(self, string, pipeline=False):
+            """Parse `string` with format and extract rgba values"""
 
-                    out_obj[k] = attr_val  # set value to out_obj.{KEY}
-            self.logger.log(utils.get_setting('VDEBUG'), out_obj)
+            # extract values from `color` string using the compiled regex
+            match = self.parse_re.search(string)
+            vdebug = utils.get_setting('VDEBUG')
+            debug = self.logger.isEnabledFor(vdebug)
+            if debug:
+                self.logger.log(vdebug, match.groupdict())
+
+            # construct out_obj Color object, the converted values being
+            # checked here rather than by Color.__new__
+            rgba = [0.0, 0.0, 0.0, 1.0]
+
+            for k, i, base, maxval, convert_fun in self.converters:
+                attr_val = int(match.group(k), base)/maxval \
+                    if convert_fun is None else convert_fun(match.group(k))
+                if not 0 <= attr_val <= 1:
+                    raise ValueError('Value must be beetween 0 and 1!')
+                rgba[i] = attr_val
+            out_obj = Color.intern(*rgba)
+            if debug:
+                self.logger.log(vdebug, out_obj)
 
             if pipeline:
                 return PipelineableObject(self, out_obj)
@@ -299,68 +502,120 @@ class Color(Value):
         def auto_parse(s, pipeline=False):
             return Color.Formatter.get_format(s).parse(s, pipeline=pipeline)
 
-    def __init__(self, *args, **kwargs):
-        """Set RGBA values according to tuple of floats from 0 to 1
+    def __new__(cls, *args, **kwargs):
+        """Return the color of RGBA values given as floats from 0 to 1
         can take in a tuple/list of rgb/rgba values
         and/or keyword arguments of rgba values: R=0.1, g=0.7
         """
-        # get logger
-        self.logger = logging.getLogger('Systhemer.value.ColorFormat')
-
-        # save values
+        rgba = [0.0, 0.0, 0.0, 1.0]
         valid_arguments = True
 
-        if len(args) == 1:
-            if type(args[0]) in (tuple, list):
-                if len(args[0]) == 3:
-                    self.R, self.G, self.B = args[0]
-                elif len(args[0]) == 4:
-                    self.R, self.G, self.B, self.A = args[0]
-                else:
-                    valid_arguments = False
-        elif len(args) == 3:
-            self.R, self.G, self.B = args
-        elif len(args) == 4:
-            self.R, self.G, self.B, self.A = args
+        if len(args) == 1 and type(args[0]) in (tuple, list):
+            args = args[0]
+        if len(args) in (3, 4):
+            rgba[:len(args)] = args
         elif len(args) != 0:
             valid_arguments = False
 
         for kwarg in kwargs:
-            self[kwarg.upper()] = kwargs[kwarg]
+            try:
+                rgba[cls.channels.index(kwarg.upper())] = kwargs[kwarg]
+            except ValueError:
+                valid_arguments = False
 
         if not valid_arguments:
-            self.logger.critical('Invalid arguments passed to constructor!')
+            cls.logger.critical('Invalid arguments passed to constructor!')
             exit(1)
 
-        # validate attributes
-        for attr in 'RGBA':
-            if self[attr] > 1 or self[attr] < 0:
-                self.logger.critical('RGBA values not all from 0 to 1!: %s',
-                                     self)
+        # validate values
+        rgba = [float(v) for v in rgba]
+        for v in rgba:
+            if not 0 <= v <= 1:
+                cls.logger.critical('RGBA values not all from 0 to 1!: %s',
+                                    rgba)
                 exit(1)
 
-    def __getitem__(self, key):
-        if key in 'RGBA':
-            return getattr(self, key)
-        else:
-            raise KeyError()
+        return cls.intern(*rgba)
 
-    def __setitem__(self, key, value):
-        if key in 'RGBA':
-            if value is str:
-                if value[0] in ['x', '0x', 'X', '0X']:
-                    value = int(value, 16)
-                elif value == 'nan':
-                    raise ValueError('float value `nan` not supported')
+    def __init__(self, *args, **kwargs):
+        # everything is done by __new__, the color may already be in use
+        pass
 
-            value = float(value)
-            if value < 0 or value > 1:
-                raise ValueError('Value must be beetween 0 and 1!')
+    @classmethod
+    def intern(cls, R, G, B, A=1.0):
+        """Return the color of the (float, already checked) RGBA values.
 
-            setattr(self, key, value)
+        The color is looked up in the recent colors first.
+        ``Color.instances`` is a plain dict, cheaper than a weak one, which
+        is cleared when it holds ``Color.instances_size`` colors: colors
+        are compared by value, so interning is only a memory optimization.
+        """
+        key = (R, G, B, A)
+        color = Color.instances.get(key)
+        if color is None or color.__class__ is not cls:
+            # set through object, Color.__setattr__ refusing any change
+            color = object.__new__(cls)
+            object.__setattr__(color, 'R', R)
+            object.__setattr__(color, 'G', G)
+            object.__setattr__(color, 'B', B)
+            object.__setattr__(color, 'A', A)
+            object.__setattr__(color, '_hash', hash(key))
+            if len(Color.instances) >= Color.instances_size:
+                Color.instances.clear()
+            Color.instances[key] = color
+        return color
+
+    def __reduce__(self):
+        return (self.intern, (self.R, self.G, self.B, self.A))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Color objects are immutable')
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, Color):
+            return self.R == other.R and self.G == other.G and \
+                self.B == other.B and self.A == other.A
+        return NotImplemented
 
+    def __getitem__(self, key):
+        if key in self.channels:
+            return getattr(self, key)
         else:
-            raise KeyError()
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        raise TypeError('Color objects are immutable')
+
+    @classmethod
+    def clipped(cls, R, G, B, A=1.0):
+        """Return the color of the RGBA values clipped from 0 to 1."""
+        return cls.intern(*(min(max(float(v), 0.0), 1.0)
+                            for v in (R, G, B, A)))
+
+    def mix(self, other, t=0.5):
+        """Return the color mixed with `other`, `t` being its weight."""
+        return self.clipped(*((1 - t) * a + t * b for a, b in zip(
+            (self.R, self.G, self.B, self.A),
+            (other.R, other.G, other.B, other.A))))
+
+    def lighten(self, amount):
+        """Return the color mixed with white by `amount`, keeping alpha."""
+        return self.clipped(*(v + (1 - v) * amount
+                              for v in (self.R, self.G, self.B)), self.A)
+
+    def darken(self, amount):
+        """Return the color mixed with black by `amount`, keeping alpha."""
+        return self.clipped(*(v * (1 - amount)
+                              for v in (self.R, self.G, self.B)), self.A)
+
+    def alpha(self, A):
+        """Return the color with the alpha channel `A`."""
+        return self.clipped(self.R, self.G, self.B, A)
 
     def __repr__(self):
         return self.__class__.__name__ + '(%f, %f, %f, %f)' \
@@ -394,6 +649,8 @@ class Litteral(Value):
 
         def __init__(self):
             """String litteral value type"""
+            if self.initialized:
+                return
             # For now, (until i can figure it out,) it displays logger class
             # as Systhemer.value.Value.Formatter instead of actual
             # instance parent class name :(
@@ -401,6 +658,7 @@ class Litteral(Value):
             self.logger = logging.getLogger('Systhemer.value.%s.%s'
                                             % ('Value',  # fix this!
                                                self.__class__.__name__))
+            self.initialized = True
 
         def __repr__(self):
             return self.__class__.__name__ + '()'
@@ -421,8 +679,25 @@ class Litteral(Value):
         def auto_parse(s, pipeline=False):
             return Litteral.Formatter().parse(s, pipeline=pipeline)
 
+    __slots__ = ('s',)
+
     def __init__(self, s):
-        self.s = s
+        # immutable, litterals are shared by the parse cache
+        object.__setattr__(self, 's', s)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Litteral objects are immutable')
+
+    def __hash__(self):
+        return hash(self.s)
+
+    def __eq__(self, other):
+        if isinstance(other, Litteral):
+            return self.s == other.s
+        return NotImplemented
+
+    def __reduce__(self):
+        return (Litteral, (self.s,))
 
     def __repr__(self):
         return 'Litteral(\'%s\')' % self.s
@@ -433,3 +708,302 @@ class Litteral(Value):
     def format(self, pipeline=False):
         """Useless and only for modularity sake"""
         return self.Formatter().format(self, pipeline=pipeline)
+
+
+def get_numpy():
+    """Return the numpy module, needed by :class:`ColorArray`.
+
+    Exits if numpy is not installed.
+    """
+    try:
+        import numpy
+    except ImportError:
+        logging.getLogger('Systhemer.value.ColorArray').critical(
+            'numpy is needed for ColorArray values, please install it!')
+        exit(1)
+    return numpy
+
+
+class ColorArray(Value):
+    """Value subclass for lists of colors, e.g. terminal palettes.
+
+    Stores the red, green, blue and alpha channels of N colors as a N×4
+    numpy array of floats ranging from 0 - 1 (``self.rgba``), so that
+    palettes are parsed, formatted and transformed in bulk rather than
+    color by color. numpy is only imported when a ColorArray is used.
+
+    In configuration files, palettes are lists of colors in any of the
+    :class:`Color.formats` separated by spaces, commas, colons or
+    semicolons.
+    """
+    item_re = re.compile(r'rgb(?:\.f)?\([^)]*\)|[^\s,;:]+')
+    logger = logging.getLogger('Systhemer.value.ColorArray')
+
+    class Formatter(Value.Formatter):
+        memoize = False  # ColorArray values are mutable
+
+        @staticmethod
+        def get_type():
+            return ColorArray
+
+        def __init__(self, fmat, sep=' '):
+            """Formatter of palettes of colors in the :class:`Color` format
+            `fmat`, separated by `sep`.
+            """
+            if self.initialized:
+                return
+            super(self.__class__, self).__init__(fmat)
+            self.sep = sep
+            self.color_formatter = Color.Formatter(fmat)
+            self.initialized = True
+
+        def __repr__(self):
+            return self.__class__.__name__ + '(%r, %r)' % (self.fmat,
+                                                           self.sep)
+
+        def get_rgx(self):
+            item = ColorArray.item_re.pattern
+            return r'((?:%s)(?:%s(?:%s))*)' % (item, re.escape(self.sep),
+                                                item)
+
+        def format(self, value, pipeline=False):
+            out_str = self.sep.join(value.format_list(self.color_formatter))
+            if pipeline:
+                return PipelineableObject(self, out_str)
+            return out_str
+
+        def parse(self, string, pipeline=False):
+            out_obj = ColorArray.from_strings(ColorArray.split(string),
+                                              self.color_formatter)
+            if pipeline:
+                return PipelineableObject(self, out_obj)
+            return out_obj
+
+        @staticmethod
+        def auto_parse(s, pipeline=False):
+            strings = ColorArray.split(s)
+            out_obj = ColorArray.from_strings(strings)
+            if pipeline:
+                fmatter = Color.Formatter.get_format(strings[0]) \
+                    if strings else Color.Formatter(Color.formats.hexRRGGBB)
+                return PipelineableObject(ColorArray.Formatter(fmatter.fmat),
+                                          out_obj)
+            return out_obj
+
+    def __init__(self, colors=()):
+        """Set the colors from a sequence of :class:`Color` objects or of
+        tuples of RGB/RGBA floats from 0 to 1, or from a N×3 or N×4 array.
+        """
+        np = get_numpy()
+
+        if isinstance(colors, ColorArray):
+            colors = colors.rgba
+        elif not isinstance(colors, np.ndarray):
+            colors = [(c.R, c.G, c.B, c.A) if isinstance(c, Color) else c
+                      for c in colors]
+        rgba = np.array(colors, dtype=float)
+        if rgba.size == 0:
+            rgba = rgba.reshape(0, 4)
+
+        if rgba.ndim != 2 or rgba.shape[1] not in (3, 4):
+            self.logger.critical('Invalid arguments passed to constructor!')
+            exit(1)
+        if rgba.shape[1] == 3:
+            rgba = np.hstack([rgba, np.ones((len(rgba), 1))])
+        if ((rgba < 0) | (rgba > 1)).any():
+            self.logger.critical('RGBA values not all from 0 to 1!')
+            exit(1)
+
+        self.rgba = rgba
+
+    @staticmethod
+    def split(string):
+        """Return the list of the color strings of `string`."""
+        return ColorArray.item_re.findall(string)
+
+    @classmethod
+    def from_strings(cls, strings, formatter=None):
+        """Parse the list of color `strings` in bulk.
+
+        Strings are parsed with the :class:`Color.Formatter` `formatter`, or
+        with the format found for each of them by
+        :meth:`Color.Formatter.get_format`. Strings of formats made of
+        fixed-width hexadecimal or decimal fields are decoded all at once.
+        """
+        np = get_numpy()
+        rgba = np.zeros((len(strings), 4))
+        rgba[:, 3] = 1
+
+        groups = {}  # {Color.Formatter: [index in strings]}
+        for i, s in enumerate(strings):
+            fmatter = formatter or Color.Formatter.get_format(s)
+            if fmatter is None:
+                exit(1)
+            groups.setdefault(fmatter, []).append(i)
+
+        for fmatter, indexes in groups.items():
+            cls._parse_group(np, fmatter, [strings[i] for i in indexes],
+                             rgba, indexes)
+        return cls(rgba)
+
+    # value of each ascii char as a digit, 99 if it isn't one
+    _digits = [int(chr(c), 16) if chr(c) in '0123456789abcdefABCDEF'
+               else 99 for c in range(256)]
+
+    @classmethod
+    def _parse_group(cls, np, fmatter, strings, rgba, indexes):
+        """Parse `strings`, all in the format of `fmatter`, into the rows
+        `indexes` of `rgba`."""
+        layout = fmatter.layout
+        length = len(strings[0])
+        codes = None
+        if layout is not None and \
+           all(type(p) is str or p[1] != 'f' for p in layout) and \
+           sum(len(p) if type(p) is str else p[2] for p in layout) == length \
+           and all(len(s) == length for s in strings):
+            try:
+                codes = np.frombuffer(''.join(strings).encode('ascii'),
+                                      dtype=np.uint8).reshape(-1, length)
+            except UnicodeEncodeError:
+                pass
+
+        if codes is not None:
+            digits = np.array(cls._digits, dtype=np.intp)[codes]
+            out = rgba[indexes]
+            pos = 0
+            for part in layout:
+                if type(part) is str:
+                    lit = np.frombuffer(part.encode('ascii'), dtype=np.uint8)
+                    if (codes[:, pos:pos+len(part)] != lit).any():
+                        break
+                    pos += len(part)
+                    continue
+
+                val, bchar, num_digits, _ = part
+                base = Color.Formatter.bases[bchar]
+                d = digits[:, pos:pos+num_digits]
+                if (d >= base).any():
+                    break
+                weights = base ** np.arange(num_digits - 1, -1, -1)
+                out[:, 'RGBA'.index(val)] = (d @ weights) \
+                    / ((base**num_digits)-1)
+                pos += num_digits
+            else:
+                rgba[indexes] = out
+                return
+
+        # color by color, e.g. for floats or to report invalid strings
+        for i, s in zip(indexes, strings):
+            c = fmatter.parse(s)
+            rgba[i] = c.R, c.G, c.B, c.A
+
+    def format_list(self, formatter):
+        """Return the list of the colors formatted by the
+        :class:`Color.Formatter` `formatter`.
+
+        Formats made of standard fields (see
+        :meth:`Color.Formatter.compile_format`) are formatted all at once.
+        """
+        np = get_numpy()
+        layout = formatter.layout
+        if layout is None:
+            return [formatter.format(c) for c in self]
+
+        out = None
+        for part in layout:
+            if type(part) is not str:
+                val, bchar, num_digits, table = part
+                maxval = (Color.Formatter.bases[bchar]**num_digits)-1
+                ints = np.rint(self.rgba[:, 'RGBA'.index(val)] * maxval)
+                part = np.array(table, dtype=object)[ints.astype(np.intp)]
+            out = part if out is None else out + part
+
+        if out is None:
+            return [''] * len(self)
+        if type(out) is str:
+            return [out] * len(self)
+        return out.tolist()
+
+    def _as_rgba(self, other):
+        """Return `other` (a ColorArray, a Color or an array) as an array
+        of RGBA rows."""
+        np = get_numpy()
+        if isinstance(other, ColorArray):
+            return other.rgba
+        if isinstance(other, Color):
+            return np.array([[other.R, other.G, other.B, other.A]])
+        return ColorArray(np.atleast_2d(other)).rgba
+
+    def _new(self, rgba):
+        return ColorArray(get_numpy().clip(rgba, 0, 1))
+
+    def mix(self, other, t=0.5):
+        """Return the colors mixed with `other`, `t` being its weight.
+
+        `other` is a ColorArray of the same length, or a :class:`Color` to
+        mix every color with.
+        """
+        return self._new((1 - t) * self.rgba + t * self._as_rgba(other))
+
+    def lighten(self, amount):
+        """Return the colors mixed with white by `amount`, keeping alpha."""
+        rgba = self.rgba.copy()
+        rgba[:, :3] += (1 - rgba[:, :3]) * amount
+        return self._new(rgba)
+
+    def darken(self, amount):
+        """Return the colors mixed with black by `amount`, keeping alpha."""
+        rgba = self.rgba.copy()
+        rgba[:, :3] *= 1 - amount
+        return self._new(rgba)
+
+    def composite(self, background):
+        """Return the colors composited over `background` (alpha 'over').
+
+        `background` is a ColorArray of the same length, or a
+        :class:`Color`.
+        """
+        np = get_numpy()
+        bg = self._as_rgba(background)
+        alpha = self.rgba[:, 3:]
+        bg_alpha = bg[:, 3:] * (1 - alpha)
+        out_alpha = alpha + bg_alpha
+        rgb = self.rgba[:, :3] * alpha + bg[:, :3] * bg_alpha
+        rgb = np.divide(rgb, out_alpha, out=np.zeros_like(rgb),
+                        where=out_alpha > 0)
+        return self._new(np.hstack([rgb, out_alpha]))
+
+    def __len__(self):
+        return len(self.rgba)
+
+    def __iter__(self):
+        return (Color.intern(*row) for row in self.rgba.tolist())
+
+    def __getitem__(self, key):
+        """Return the :class:`Color` at index `key`, or a ColorArray of the
+        colors selected by a slice or an array of indexes."""
+        if isinstance(key, int):
+            return Color.intern(*self.rgba[key].tolist())
+        return ColorArray(self.rgba[key])
+
+    def __setitem__(self, key, value):
+        self.rgba[key] = self._as_rgba(value)
+
+    def __repr__(self):
+        return self.__class__.__name__ + '([%s])' % ', '.join(
+            self.format_list(Color.Formatter(Color.formats.hexRRGGBBAA)))
+
+    def __str__(self):
+        return repr(self)
+
+    def format(self, fmat, pipeline=False):
+        """Calls formatter.format to allow pipeline structured code.
+
+        the `fmat` parameter can be a :class:`Color` format string, from
+        which a formatter separating colors with spaces is generated, or a
+        formatter object directly
+        """
+        if type(fmat) is str:
+            return self.Formatter(fmat).format(self, pipeline=pipeline)
+        elif isinstance(fmat, Value.Formatter):
+            return fmat.format(self, pipeline=pipeline)
@@ -0,0 +1,104 @@
+"""Watching a theme file to re-apply what changes.
+
+The values each ProgDef applies differently are found by
+:meth:`ProgDef.diff_values <Progs.template.ProgDef.diff_values>`.
+
+Classes:
+    * :class:`Watcher` - Iterator over the changes of a file
+"""
+
+
+import logging
+import os
+import struct
+import time
+logger = logging.getLogger('Systhemer.Progs.watch')
+
+# inotify(7) event masks
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+
+
+class Watcher(object):
+    """Iterator over the changes of the file `path`.
+
+    Iterating blocks until the file changes, and yields the time (as
+    :func:`time.time`) it was last modified. The directory of the file is
+    watched with inotify if available, so that editors replacing the file
+    are noticed, otherwise the file is polled every `poll_interval`
+    seconds.
+    """
+    poll_interval = 0.25
+
+    def __init__(self, path):
+        self.logger = logger
+        self.path = os.path.abspath(path)
+        self.fd = self.init_inotify()
+
+    def __repr__(self):
+        return self.__class__.__name__ + '(%s, %s)' \
+            % (self.path, 'inotify' if self.fd is not None else 'polling')
+
+    def init_inotify(self):
+        """Return an inotify file descriptor watching the directory of the
+        file, or None if inotify is not available."""
+        import ctypes
+        import ctypes.util
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            fd = libc.inotify_init1(os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            fd = -1
+        if fd < 0:
+            self.logger.info('inotify not available, polling %s', self.path)
+            return None
+
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(fd, os.fsencode(os.path.dirname(self.path)),
+                                  mask) < 0:
+            os.close(fd)
+            self.logger.info('Could not watch %s with inotify, polling it',
+                             self.path)
+            return None
+        return fd
+
+    def get_stat(self):
+        """Return what identifies the version of the file, None if it is
+        missing (e.g. while being replaced)."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def wait_inotify(self):
+        """Block until an event concerns the file."""
+        name = os.fsencode(os.path.basename(self.path))
+        while True:
+            events = os.read(self.fd, 4096)
+            pos = 0
+            while pos < len(events):
+                wd, mask, cookie, length = struct.unpack_from('iIII', events,
+                                                              pos)
+                pos += 16
+                if events[pos:pos+length].rstrip(b'\0') == name:
+                    return
+                pos += length
+
+    def __iter__(self):
+        stat = self.get_stat()
+        while True:
+            if self.fd is not None:
+                self.wait_inotify()
+            else:
+                time.sleep(self.poll_interval)
+            new_stat = self.get_stat()
+            if new_stat is not None and new_stat != stat:
+                stat = new_stat
+                yield stat[0] / 1e9
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
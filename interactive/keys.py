@@ -0,0 +1,31 @@
+import Progs
+from Progs.registry import KeyRegistry
+
+
+def keys(self, args):
+    """usage: keys [KEY]
+
+    List the keys of the installed programs with their value type,
+    formatter and program, or only the keys matching KEY
+    ('*' matches any part of a dotted key)
+    """
+    args = args.split()
+    registry = getattr(self, 'key_registry', None)
+    if registry is None:
+        registry = self.key_registry = KeyRegistry(Progs.get_prog_defs())
+        registry.report_conflicts()
+
+    if not args:
+        names = list(registry)
+    elif '*' in args[0]:
+        names = registry.expand_key(args[0])
+    else:
+        names = [args[0]]
+
+    for key in names:
+        key_type = registry.get(key)
+        if key_type is None:
+            print('Key \'%s\' not found!' % key)
+            continue
+        print('%-30s %-10s %-30r %s' % (key, key_type.val_type.__name__,
+                                         key_type.formatter, key_type.prog))
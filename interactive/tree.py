@@ -1,4 +1,5 @@
 import Progs
+import Progs.config
 
 
 def tree(self, args):
@@ -14,15 +15,15 @@ def tree(self, args):
         return
 
     target = args.pop(0)
-    for pd in Progs.prog_defs:
-        if target == pd.get_name():
-            print(pd.get_config())
-            for i, b in enumerate(pd.get_config()):
-                if i == len(pd.get_config())-1:
-                    elbow = True
-                else:
-                    elbow = False
-                recur(b, [], [], elbow)
+    if target in Progs.manifest:
+        pd = Progs.get_prog_def(target)
+        print(pd.get_config())
+        for i, b in enumerate(pd.get_config()):
+            if i == len(pd.get_config())-1:
+                elbow = True
+            else:
+                elbow = False
+            recur(b, [], [], elbow)
 
 
 def recur(branch, sep_array, seps, elbow):
@@ -1,7 +1,38 @@
 import logging
 
 
-def setup_logger(Settings):
+class LazyColoredFormatter(logging.Formatter):
+    """`colorlog.ColoredFormatter`, imported when first formatting.
+
+    Falls back to `fallback` if colorlog is not installed, setting the
+    `no_colorlog` setting so that the other outputs (e.g. diffs) are not
+    colored either.
+    """
+    def __init__(self, Settings, fallback, *args, **kwargs):
+        super().__init__()
+        self.Settings = Settings
+        self.fallback = fallback
+        self.args = args
+        self.kwargs = kwargs
+        self.formatter = None
+
+    def format(self, record):
+        if self.formatter is None:
+            try:
+                from colorlog import ColoredFormatter
+                self.formatter = ColoredFormatter(*self.args, **self.kwargs)
+            except ImportError:
+                self.Settings.no_colorlog = True
+                self.formatter = self.fallback
+        return self.formatter.format(record)
+
+
+def setup_logger(Settings, log_file=True):
+    """Setup the 'Systhemer' logger.
+
+    With `log_file`, everything is also logged to 'systhemer.log', which
+    is only opened when the first record is logged.
+    """
     log_props = Settings.log_props
     MAXLEN = log_props['MAXLEN']
     log_names = log_props['log_names']
@@ -16,7 +47,7 @@ def setup_logger(Settings):
     ERROR = log_names[logging.ERROR]
     CRITICAL = log_names[logging.CRITICAL]
 
-    fileHandler = logging.FileHandler('systhemer.log', mode='w')
+    fileHandler = logging.FileHandler('systhemer.log', mode='w', delay=True)
     consHandler = logging.StreamHandler()
     fileFormatter = logging.Formatter(
         '%(levelname)-'+str(MAXLEN)+'s'
@@ -30,8 +61,8 @@ def setup_logger(Settings):
     reset = '%(reset)s'
 
     if not Settings.no_colorlog:
-        from colorlog import ColoredFormatter
-        consFormatter = ColoredFormatter(
+        consFormatter = LazyColoredFormatter(
+            Settings, fileFormatter,
             lc+'%(levelname)-'+str(MAXLEN)+'s'+reset
             + llc+':%(name)-25s: '
             + mlc+'%(message)s'+reset,
@@ -66,7 +97,8 @@ def setup_logger(Settings):
 
     logger = logging.getLogger('Systhemer')
     logger.setLevel(Settings.VDEBUG)
-    logger.addHandler(fileHandler)
+    if log_file:
+        logger.addHandler(fileHandler)
     logger.addHandler(consHandler)
 
     return logger
@@ -0,0 +1,47 @@
+"""Tests of :mod:`Progs.scope`."""
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Progs import common
+from Progs import value
+from Progs.config import RuleTree, Rule, Section
+from Progs.scope import ScopeIndex
+
+
+class Settings:
+    VDEBUG = 9
+
+
+class TestNestedHeaders(unittest.TestCase):
+    def setUp(self):
+        common.Settings = Settings
+        fmat = value.Color.Formatter(value.Color.formats.hexRRGGBB)
+        self.rule = Rule([r'test', r'[ \t]+', fmat], {'testval': 1})
+        self.tree = RuleTree(
+            Section(r'([ \t\n]+|^)bar', '{', '}',
+                    Section(r'([ \t\n]+|^)subbar', '{', '}', self.rule)))
+        self.tree.get_leaves()
+
+    def get_scope_text(self, text):
+        scope = ScopeIndex(text, self.tree).get_scope(self.rule)
+        return None if scope is None else text[scope.start:scope.end]
+
+    def test_header_opening_parent_block(self):
+        # '^' matches at the start of the parent block
+        text = 'bar {subbar { test #000000 }\n}\n'
+        self.assertEqual(self.get_scope_text(text), ' test #000000 ')
+
+    def test_header_after_whitespace(self):
+        text = 'bar {\n  subbar { test #000000 }\n}\n'
+        self.assertEqual(self.get_scope_text(text), ' test #000000 ')
+
+    def test_header_not_at_block_start(self):
+        # 'subbar' glued to another word is not a header
+        text = 'bar {xsubbar { test #000000 }\n}\n'
+        self.assertIsNone(self.get_scope_text(text))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Tests of the changes applied in watch mode (see
+:meth:`Progs.template.ProgDef.diff_values`)."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Progs import common
+from Progs import expr
+from Progs.i3wm import i3wm
+from Progs.value import Color
+
+
+class Settings:
+    VDEBUG = 9
+    show_diff = False
+    make_backup = False
+
+
+class TestWatchChanges(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        Settings.i3wm_file_path = os.path.join(self.tmp_dir, 'config')
+        shutil.copy(os.path.join(ROOT, 'files', 'i3_dummy'),
+                    Settings.i3wm_file_path)
+        common.Settings = Settings
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def parse(self, theme):
+        values = {section_id: {key: expr.parse(val)
+                               if expr.is_expression(val, section)
+                               else Color.Formatter.auto_parse(val)
+                               for key, val in section.items()}
+                  for section_id, section in theme.items()}
+        expr.link(values)
+        return values
+
+    def assert_watch_applies(self, old, new):
+        """Check that applying the changes from `old` to `new` gives the
+        file a whole apply of `new` gives."""
+        old, new = self.parse(old), self.parse(new)
+        watched = i3wm()
+        watched.apply(old)
+        watched.apply(watched.diff_values(old, new))
+        applied = i3wm()
+        applied.apply(new)
+        self.assertEqual(watched.get_file_buffer(),
+                         applied.get_file_buffer())
+        return watched.diff_values(old, new)
+
+    def test_wildcard_under_explicit_key(self):
+        # the explicit key keeps precedence over the changed wildcard
+        changed = self.assert_watch_applies(
+            {'theme': {'urgent.*': '#abcdef', 'urgent.border': '#111111'}},
+            {'theme': {'urgent.*': '#fedcba', 'urgent.border': '#111111'}})
+        self.assertNotIn('urgent.border', changed['theme'])
+        self.assertIn('urgent.background', changed['theme'])
+
+    def test_key_added_to_earlier_section(self):
+        # the later section setting the key wins
+        changed = self.assert_watch_applies(
+            {'theme': {}, 'theme2': {'background': '#333333'}},
+            {'theme': {'background': '#444444'},
+             'theme2': {'background': '#333333'}})
+        self.assertEqual(changed, {})
+
+    def test_reference_changed(self):
+        changed = self.assert_watch_applies(
+            {'theme': {'accent': '#3daee9', 'focused.border': 'accent',
+                       'urgent.border': 'lighten(accent, 0.2)'}},
+            {'theme': {'accent': '#da4453', 'focused.border': 'accent',
+                       'urgent.border': 'lighten(accent, 0.2)'}})
+        self.assertEqual(sorted(changed['theme']),
+                         ['focused.border', 'urgent.border'])
+
+
+if __name__ == '__main__':
+    unittest.main()